@@ -11,7 +11,7 @@ logger = logging.getLogger("pdf_read_refresh.auth")
 JWT_SECRET = os.getenv("JWT_HS_SECRET", "change_me_in_production")
 JWT_ISSUER = os.getenv("JWT_ISS", "chatgbtmini")
 JWT_AUDIENCE = os.getenv("JWT_AUD", "chatgbtmini-mobile")
-PUBLIC_PATHS = {"/health", "/healthz", "/docs", "/openapi.json", "/redoc"}
+PUBLIC_PATHS = frozenset({"/health", "/healthz", "/docs", "/openapi.json", "/redoc"})
 
 
 def _verify_bearer_token(auth_header: Optional[str]) -> Dict:
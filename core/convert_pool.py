@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from core.scratch import scratch_base_dir
+from core.word_to_pdf import (
+    convert_word_bytes_to_pdf_bytes,
+    convert_word_file_to_pdf_file,
+    convert_word_files_to_pdf_files,
+)
+from core.word_to_pdf.listener import get_listener
+
+logger = logging.getLogger("pdf_read_refresh.core.convert_pool")
+
+_T = TypeVar("_T")
+
+MAX_WORKERS = min(os.cpu_count() or 1, 4)
+
+
+@lru_cache(maxsize=1)
+def soffice_concurrency() -> int:
+    """
+    Conversions allowed at once (SOFFICE_CONCURRENCY, clamped to 1..MAX_WORKERS). Every worker has its
+    own profile, so up to MAX_WORKERS can overlap safely. Read on first use, after main.py has loaded .env.
+    """
+    try:
+        value = int(os.getenv("SOFFICE_CONCURRENCY", str(MAX_WORKERS)))
+    except ValueError:
+        return MAX_WORKERS
+    return max(1, min(value, MAX_WORKERS))
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_SEMAPHORE: Optional[asyncio.Semaphore] = None
+
+
+def _semaphore() -> asyncio.Semaphore:
+    global _SEMAPHORE
+    if _SEMAPHORE is None:
+        _SEMAPHORE = asyncio.Semaphore(soffice_concurrency())
+    return _SEMAPHORE
+
+
+def _per_worker_setup() -> None:
+    """Give every worker its own LibreOffice profile so conversions never contend on the lock."""
+    os.environ["UNO_USER_DIR"] = os.path.join(tempfile.gettempdir(), f"lo_prof_{os.getpid()}")
+    scratch = scratch_base_dir()
+    if scratch:
+        # The worker's temp files and every soffice it starts (which honours TMPDIR) land on tmpfs.
+        os.environ["TMPDIR"] = scratch
+        tempfile.tempdir = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # spawn instead of fork: the parent runs gRPC/Firebase threads that are not fork-safe.
+        _POOL = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_per_worker_setup,
+        )
+        logger.info(
+            "LibreOffice convert pool created",
+            extra={"workers": MAX_WORKERS, "concurrency": soffice_concurrency()},
+        )
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    """Stop the pool's workers; each one stops its LibreOffice listener on the way out."""
+    global _POOL
+    pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+        logger.info("LibreOffice convert pool stopped")
+
+
+def _discard_broken_pool(pool: ProcessPoolExecutor) -> None:
+    global _POOL
+    # Concurrent callers may all see the same broken pool; only the first replaces it.
+    if _POOL is pool:
+        _POOL = None
+        logger.warning("LibreOffice convert pool broken; starting a fresh one")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_in_pool(fn: Callable[..., _T], *args: Any) -> _T:
+    """
+    Run `fn(*args)` on the pool. A worker that died mid-task (e.g. an OOM-killed conversion) breaks
+    the whole executor, so the broken pool is dropped and the call retried once on a fresh one.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        _discard_broken_pool(pool)
+    return await loop.run_in_executor(get_pool(), fn, *args)
+
+
+def _start_worker_listener() -> bool:
+    """Bring up the worker's listener and push one tiny document through it (or one-shot soffice)."""
+    listener = get_listener()
+    # The first conversion also creates the worker's LibreOffice profile, which takes seconds.
+    with tempfile.TemporaryDirectory(prefix="lo_warmup_") as tmpdir:
+        src = Path(tmpdir) / "warmup.txt"
+        src.write_text("warmup", encoding="utf-8")
+        try:
+            convert_word_file_to_pdf_file(src, Path(tmpdir))
+        except Exception as exc:
+            logger.warning("LibreOffice warm-up conversion failed", extra={"error": str(exc)})
+    return listener is not None
+
+
+async def start_listeners() -> None:
+    """
+    Ask every worker to bring up its warm LibreOffice listener and run a warm-up conversion,
+    so the first real request does not pay for LibreOffice start-up or profile creation.
+    Best effort: a worker whose listener cannot start keeps converting with one-shot soffice.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, _start_worker_listener) for _ in range(MAX_WORKERS)),
+        return_exceptions=True,
+    )
+    logger.info("LibreOffice listeners started", extra={"ready": sum(1 for r in results if r is True)})
+
+
+async def convert_async(content: bytes, suffix: str = ".docx") -> Tuple[bytes, str]:
+    """
+    Convert office bytes to PDF on the shared process pool.
+    At most soffice_concurrency() conversions run at once; further callers wait here instead of queueing in the pool.
+    """
+    async with _semaphore():
+        return await _run_in_pool(convert_word_bytes_to_pdf_bytes, content, suffix)
+
+
+async def convert_file_async(src: Path, outdir: Path) -> Path:
+    """Path-based variant of convert_async: soffice reads `src` and writes the PDF into `outdir`."""
+    async with _semaphore():
+        return await _run_in_pool(convert_word_file_to_pdf_file, src, outdir)
+
+
+async def convert_batch_async(srcs: Sequence[Path], outdir: Path) -> List[Path]:
+    """Convert several files in one soffice run on a single pool worker; PDF paths follow input order."""
+    async with _semaphore():
+        return await _run_in_pool(convert_word_files_to_pdf_files, list(srcs), outdir)
+
+
+__all__ = [
+    "MAX_WORKERS",
+    "convert_async",
+    "convert_batch_async",
+    "convert_file_async",
+    "get_pool",
+    "shutdown_pool",
+    "soffice_concurrency",
+    "start_listeners",
+]
@@ -0,0 +1,35 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+DEFAULT_PDF_MODEL = "gemini-2.5-flash"
+
+
+@dataclass(frozen=True)
+class GeminiConfig:
+    api_key: Optional[str]
+    pdf_model_env: Optional[str]
+    pptx_model_env: Optional[str]
+    doc_model_env: Optional[str]
+
+    @property
+    def pdf_model(self) -> str:
+        return self.pdf_model_env or DEFAULT_PDF_MODEL
+
+
+@lru_cache(maxsize=1)
+def get_gemini_config() -> GeminiConfig:
+    """
+    Gemini settings read once from the environment.
+    Resolved lazily (not at import) because main.py loads .env after importing the routers.
+    """
+    return GeminiConfig(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        pdf_model_env=os.getenv("GEMINI_PDF_MODEL") or None,
+        pptx_model_env=os.getenv("GEMINI_PPTX_MODEL") or None,
+        doc_model_env=os.getenv("GEMINI_DOC_MODEL") or None,
+    )
+
+
+__all__ = ["DEFAULT_PDF_MODEL", "GeminiConfig", "get_gemini_config"]
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Set, Tuple, Union
+
+logger = logging.getLogger("pdf_read_refresh.core.gemini_file_cache")
+
+# Gemini deletes uploaded files after 48h; entries expire well before that.
+CACHE_MAXSIZE = 1024
+CACHE_TTL_SECONDS = 40 * 3600
+# Hash small payloads inline; larger ones are hashed off the event loop.
+_INLINE_HASH_LIMIT = 1024 * 1024
+# Context caches (cachedContents) are billed per hour, so they live much shorter than files.
+# Bump CACHE_VERSION to stop reusing every existing handle, e.g. after a prompt template change.
+CACHE_VERSION = "v1"
+CONTEXT_CACHE_TTL_SECONDS = 3600
+# Local entries expire before Gemini drops the cache, so a remembered handle is still valid.
+_CONTEXT_CACHE_MARGIN_SECONDS = 300
+
+
+class _TTLCache:
+    """Small LRU map whose entries also expire `ttl` seconds after insertion."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def forget(self, key: str) -> None:
+        self._data.pop(key, None)
+
+
+_CACHE = _TTLCache(CACHE_MAXSIZE, CACHE_TTL_SECONDS)
+_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+# An empty value marks a document Gemini refused to cache (e.g. below the minimum token count).
+_CONTEXT_CACHE = _TTLCache(CACHE_MAXSIZE, CONTEXT_CACHE_TTL_SECONDS - _CONTEXT_CACHE_MARGIN_SECONDS)
+_CONTEXT_PENDING: Set[str] = set()
+_CONTEXT_TASKS: "Set[asyncio.Task[None]]" = set()
+
+
+def _key_fingerprint(api_key: str) -> str:
+    # Uploaded files belong to the key's project, so the key is part of the cache key.
+    return hashlib.blake2b(api_key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _digest(content: bytes, api_key: str) -> str:
+    return f"{_key_fingerprint(api_key)}:{hashlib.blake2b(content, digest_size=20).hexdigest()}"
+
+
+def _digest_file(path: Union[str, Path], api_key: str) -> str:
+    hasher = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(_INLINE_HASH_LIMIT), b""):
+            hasher.update(block)
+    return f"{_key_fingerprint(api_key)}:{hasher.hexdigest()}"
+
+
+async def file_cache_key(content: bytes, api_key: str) -> str:
+    """Content address of `content` as uploaded with `api_key`."""
+    if len(content) <= _INLINE_HASH_LIMIT:
+        return _digest(content, api_key)
+    return await asyncio.to_thread(_digest, content, api_key)
+
+
+async def file_cache_key_for_path(path: Union[str, Path], api_key: str) -> str:
+    """Same key as file_cache_key(path.read_bytes(), api_key), hashed block by block off the event loop."""
+    return await asyncio.to_thread(_digest_file, path, api_key)
+
+
+def url_cache_key(url: str, api_key: str, variant: str = "") -> str:
+    """
+    Key for a file URI remembered by source URL (plus `variant`, e.g. the file name that picks the
+    converter). Lets a repeated URL skip even the download; bump CACHE_VERSION to drop them all.
+    """
+    digest = hashlib.blake2b(f"{url}|{variant}".encode("utf-8"), digest_size=20).hexdigest()
+    return f"{CACHE_VERSION}-file-uri-url:{_key_fingerprint(api_key)}:{digest}"
+
+
+async def cached_active_file_uri(key: str, is_active: Callable[[str], Awaitable[bool]]) -> Optional[str]:
+    """Cached file URI for `key` if `is_active(uri)` confirms Gemini still serves it; stale entries are dropped."""
+    file_uri = _CACHE.get(key)
+    if file_uri and not await is_active(file_uri):
+        logger.info("Gemini file cache entry no longer active", extra={"cacheKey": key, "fileUri": file_uri})
+        _CACHE.forget(key)
+        return None
+    return file_uri
+
+
+async def get_or_upload(
+    key: str,
+    upload: Callable[[], Awaitable[str]],
+    is_active: Optional[Callable[[str], Awaitable[bool]]] = None,
+) -> str:
+    """
+    Return the cached file URI for `key`, or run `upload()` and remember its result.
+    Concurrent callers with the same key wait for a single upload instead of repeating it.
+    With `is_active`, a cached URI is only reused after it confirms the file is still ACTIVE.
+    """
+    file_uri = await cached_active_file_uri(key, is_active) if is_active else _CACHE.get(key)
+    if file_uri:
+        logger.debug("Gemini file cache hit", extra={"cacheKey": key})
+        return file_uri
+    lock = _LOCKS.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _LOCKS[key] = lock
+    async with lock:
+        file_uri = _CACHE.get(key)
+        if file_uri:
+            return file_uri
+        file_uri = await upload()
+        _CACHE.set(key, file_uri)
+        return file_uri
+
+
+def context_cache_key(file_uri: str, model: str, api_key: str) -> str:
+    """Key of the context cache holding `file_uri` for `model`; file URIs are already content-addressed."""
+    return f"{CACHE_VERSION}-gemini-cache:{_key_fingerprint(api_key)}:{model}:{file_uri}"
+
+
+async def _create_context_cache(key: str, create: Callable[[], Awaitable[Optional[str]]]) -> None:
+    try:
+        name = await create()
+    except Exception as exc:
+        logger.warning("Gemini context cache create failed", extra={"cacheKey": key, "error": str(exc)})
+        name = None
+    finally:
+        _CONTEXT_PENDING.discard(key)
+    _CONTEXT_CACHE.set(key, name or "")
+
+
+def cached_content_or_schedule(key: str, create: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+    """
+    Return the cachedContents name for `key`. On the first sighting of a document, start
+    `create()` in the background and return None, so that request keeps sending the file
+    part while later requests for the same document reuse the cache.
+    """
+    name = _CONTEXT_CACHE.get(key)
+    if name is not None:
+        return name or None
+    if key not in _CONTEXT_PENDING:
+        _CONTEXT_PENDING.add(key)
+        task = asyncio.create_task(_create_context_cache(key, create))
+        _CONTEXT_TASKS.add(task)
+        task.add_done_callback(_CONTEXT_TASKS.discard)
+    return None
+
+
+__all__ = [
+    "CACHE_MAXSIZE",
+    "CACHE_TTL_SECONDS",
+    "CACHE_VERSION",
+    "CONTEXT_CACHE_TTL_SECONDS",
+    "file_cache_key",
+    "file_cache_key_for_path",
+    "url_cache_key",
+    "cached_active_file_uri",
+    "get_or_upload",
+    "context_cache_key",
+    "cached_content_or_schedule",
+]
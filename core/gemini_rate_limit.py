@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("pdf_read_refresh.core.gemini_rate_limit")
+
+# Back-off after a 429 that did not say how long to wait.
+_DEFAULT_RETRY_AFTER_SECONDS = 2.0
+# Longest a request waits for room on its key; past it the request fails instead of queueing.
+MAX_WAIT_SECONDS = 30.0
+
+
+def _env_limit(name: str) -> int:
+    # Unset, 0 or invalid leaves the bucket off: only deployments that know their quota opt in.
+    try:
+        return max(0, int(os.getenv(name) or 0))
+    except ValueError:
+        return 0
+
+
+class GeminiQuotaExceeded(Exception):
+    """The key has no room within the allowed wait; `retry_after` is how long until it does."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Gemini key quota busy for {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class _TokenBucket:
+    """
+    `per_minute` tokens, refilled evenly over a minute; holds at most one minute's worth. Tokens go
+    negative while admitted requests wait for their share, so later callers queue behind them.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens - min(amount, self.capacity))
+
+
+class GeminiKeyLimiter:
+    """RPM and TPM buckets for one API key, plus the pause a 429 asked for."""
+
+    def __init__(self, rpm: int, tpm: int) -> None:
+        self._requests = _TokenBucket(rpm) if rpm else None
+        self._tokens = _TokenBucket(tpm) if tpm else None
+        self._blocked_until = 0.0
+
+    async def acquire(self, est_tokens: int = 0, max_wait: float = MAX_WAIT_SECONDS) -> None:
+        """
+        Wait until the key has room for one more request of roughly `est_tokens` tokens, or raise
+        GeminiQuotaExceeded when that is more than `max_wait` away. The share is reserved before
+        sleeping, so no lock is held while waiting.
+        """
+        now = time.monotonic()
+        wait = self._blocked_until - now
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens is not None:
+            wait = max(wait, self._tokens.wait_time(est_tokens, now))
+        if wait > max_wait:
+            raise GeminiQuotaExceeded(wait)
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None:
+            self._tokens.take(est_tokens)
+        if wait <= 0:
+            return
+        logger.info("Gemini key limiter waiting", extra={"waitSeconds": round(wait, 2)})
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # The request never went out; hand its share to the next caller.
+            if self._requests is not None:
+                self._requests.take(-1)
+            if self._tokens is not None:
+                self._tokens.take(-est_tokens)
+            raise
+
+    def record_usage(self, est_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the TPM bucket once Gemini reports what the request really cost."""
+        if self._tokens is not None and actual_tokens is not None:
+            self._tokens.take(actual_tokens - est_tokens)
+
+    def penalize(self, retry_after: Optional[float]) -> float:
+        """Hold every request on this key back after a 429; returns the delay applied."""
+        delay = retry_after if retry_after and retry_after > 0 else _DEFAULT_RETRY_AFTER_SECONDS
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
+
+
+_LIMITERS: Dict[str, GeminiKeyLimiter] = {}
+
+
+def gemini_limiter(api_key: str) -> GeminiKeyLimiter:
+    """The process-wide limiter for `api_key`; limits come from GEMINI_RPM_LIMIT / GEMINI_TPM_LIMIT."""
+    fingerprint = hashlib.blake2b(api_key.encode("utf-8"), digest_size=8).hexdigest()
+    limiter = _LIMITERS.get(fingerprint)
+    if limiter is None:
+        limiter = _LIMITERS[fingerprint] = GeminiKeyLimiter(
+            _env_limit("GEMINI_RPM_LIMIT"),
+            _env_limit("GEMINI_TPM_LIMIT"),
+        )
+    return limiter
+
+
+__all__ = ["MAX_WAIT_SECONDS", "GeminiKeyLimiter", "GeminiQuotaExceeded", "gemini_limiter"]
@@ -2,10 +2,11 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any, Dict, Iterable, Optional, Tuple
 
 DEFAULT_LANGUAGE = "tr"
-SUPPORTED_LANGUAGES = {"tr", "en", "es", "pt", "fr", "ru"}
+SUPPORTED_LANGUAGES = frozenset({"tr", "en", "es", "pt", "fr", "ru"})
 
 LANGUAGE_ALIASES = {
     "tr-tr": "tr",
@@ -26,8 +27,9 @@ LANGUAGE_ALIASES = {
 }
 
 
+@lru_cache(maxsize=256)
 def normalize_language(language: Optional[str]) -> str:
-    """Normalize incoming language codes to a supported subset."""
+    """Normalize incoming language codes to a supported subset (memoised; clients send few distinct values)."""
 
     if not language:
         return DEFAULT_LANGUAGE
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# tmpfs keeps scratch files in RAM; only used when it has room for several large decks at once.
+_SHM_DIR = "/dev/shm"
+_SHM_MIN_FREE_BYTES = 512 * 1024 * 1024
+# Bytes promised to live tmpfs scratch dirs in this process. Their files may not be written yet, so
+# the free space alone would let concurrent requests all pick tmpfs for the same headroom.
+_shm_reserved = 0
+# Disk fallback for processes whose TMPDIR itself points at tmpfs (the conversion pool workers).
+_DISK_TMP_DIR = "/var/tmp"
+
+
+def scratch_base_dir(reserve_bytes: int = 0) -> Optional[str]:
+    """
+    Parent directory for conversion scratch files: SOFFICE_TMPDIR when set and writable, otherwise
+    /dev/shm when it has room for `reserve_bytes` beyond what other scratch dirs have reserved,
+    otherwise None (the platform temp dir).
+    """
+    configured = os.getenv("SOFFICE_TMPDIR")
+    if configured:
+        return configured if os.access(configured, os.W_OK) else None
+    try:
+        if (
+            os.access(_SHM_DIR, os.W_OK)
+            and shutil.disk_usage(_SHM_DIR).free - _shm_reserved - reserve_bytes >= _SHM_MIN_FREE_BYTES
+        ):
+            return _SHM_DIR
+    except OSError:
+        pass
+    return None
+
+
+@contextmanager
+def scratch_dir(prefix: str, reserve_bytes: int = 0) -> Iterator[str]:
+    """
+    Temporary directory for up to `reserve_bytes` of scratch files, on tmpfs when it has room for
+    them; the reservation holds until the directory is removed.
+    """
+    global _shm_reserved
+    base = scratch_base_dir(reserve_bytes)
+    reserved = reserve_bytes if base == _SHM_DIR else 0
+    if base is None and tempfile.gettempdir().startswith(_SHM_DIR):
+        base = _DISK_TMP_DIR
+    _shm_reserved += reserved
+    try:
+        with tempfile.TemporaryDirectory(prefix=prefix, dir=base) as tmpdir:
+            yield tmpdir
+    finally:
+        _shm_reserved -= reserved
+
+
+__all__ = ["scratch_base_dir", "scratch_dir"]
@@ -89,6 +89,17 @@ class ChatPersistenceService:
         if snapshot.exists:
             return
 
+        chat_ref.set(self._new_chat_payload(initial_content, metadata), merge=True)
+        logger.info(
+            "Chat document created",
+            extra={"chatId": chat_id, "userId": user_id},
+        )
+
+    def _new_chat_payload(
+        self,
+        initial_content: Optional[str],
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
         clean_title = self._derive_title(initial_content or "")
         now = datetime.utcnow()
         payload: Dict[str, Any] = {
@@ -101,12 +112,7 @@ class ChatPersistenceService:
             payload["lastMessage"] = _trim(initial_content, 150)
         if metadata:
             payload.update(metadata)
-
-        chat_ref.set(payload, merge=True)
-        logger.info(
-            "Chat document created",
-            extra={"chatId": chat_id, "userId": user_id},
-        )
+        return payload
 
     def update_chat_metadata(
         self,
@@ -117,8 +123,18 @@ class ChatPersistenceService:
         force_title: Optional[str] = None,
         extra: Optional[Dict[str, Any]] = None,
     ) -> None:
+        update_payload = self._chat_metadata_payload(content, force_title, extra)
+        if update_payload:
+            self._chat_ref(user_id, chat_id).set(update_payload, merge=True)
+
+    def _chat_metadata_payload(
+        self,
+        content: Optional[str],
+        force_title: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Dict[str, Any]]:
         if not content and not force_title and not extra:
-            return
+            return None
 
         now = datetime.utcnow()
         update_payload: Dict[str, Any] = {"timestamp": now}
@@ -134,8 +150,7 @@ class ChatPersistenceService:
 
         if extra:
             update_payload.update(extra)
-
-        self._chat_ref(user_id, chat_id).set(update_payload, merge=True)
+        return update_payload
 
     def append_message(
         self,
@@ -144,6 +159,21 @@ class ChatPersistenceService:
         chat_id: str,
         message: MessagePayload,
     ) -> str:
+        messages_ref = self._messages_ref(user_id, chat_id)
+        payload = self._message_payload(message)
+        if not message.message_id:
+            result = messages_ref.add(payload)
+            doc_ref = result[0] if isinstance(result, tuple) else result
+            doc_id = getattr(doc_ref, "id", None) or ""
+        else:
+            messages_ref.document(message.message_id).set(payload, merge=True)
+            doc_id = message.message_id
+
+        self._log_persisted(user_id, chat_id, message.role, doc_id)
+        return doc_id
+
+    @staticmethod
+    def _message_payload(message: MessagePayload) -> Dict[str, Any]:
         now = datetime.utcnow()
         payload: Dict[str, Any] = {
             "role": message.role,
@@ -162,26 +192,46 @@ class ChatPersistenceService:
             payload["metadata"]["isTemporary"] = True
         if message.client_message_id:
             payload["clientMessageId"] = message.client_message_id
+        return payload
 
-        messages_ref = self._messages_ref(user_id, chat_id)
-        if not message.message_id:
-            result = messages_ref.add(payload)
-            doc_ref = result[0] if isinstance(result, tuple) else result
-            doc_id = getattr(doc_ref, "id", None) or ""
-        else:
-            messages_ref.document(message.message_id).set(payload, merge=True)
-            doc_id = message.message_id
-
+    @staticmethod
+    def _log_persisted(user_id: str, chat_id: str, role: str, doc_id: str) -> None:
         logger.debug(
             "Message persisted",
             extra={
                 "chatId": chat_id,
                 "userId": user_id,
-                "role": message.role,
+                "role": role,
                 "messageId": doc_id,
             },
         )
-        return doc_id
+
+    def _save_chat_message(self, *, user_id: str, chat_id: str, message: MessagePayload) -> str:
+        """
+        Create the chat document if needed, refresh its metadata and append `message` with one
+        read and one batched commit, instead of up to four sequential round trips.
+        """
+        db_client = self._ensure_db()
+        chat_ref = self._chat_ref(user_id, chat_id)
+        chat_exists = chat_ref.get().exists
+        chat_payload: Dict[str, Any] = {} if chat_exists else self._new_chat_payload(message.content)
+        chat_payload.update(self._chat_metadata_payload(message.content) or {})
+
+        messages_ref = self._messages_ref(user_id, chat_id)
+        message_ref = messages_ref.document(message.message_id) if message.message_id else messages_ref.document()
+        batch = db_client.batch()
+        if chat_payload:
+            batch.set(chat_ref, chat_payload, merge=True)
+        batch.set(message_ref, self._message_payload(message), merge=True)
+        batch.commit()
+
+        if not chat_exists:
+            logger.info(
+                "Chat document created",
+                extra={"chatId": chat_id, "userId": user_id},
+            )
+        self._log_persisted(user_id, chat_id, message.role, message_ref.id)
+        return message_ref.id
 
     def save_user_message(
         self,
@@ -195,13 +245,7 @@ class ChatPersistenceService:
         is_temporary: bool = False,
         client_message_id: Optional[str] = None,
     ) -> str:
-        self.ensure_chat_document(
-            user_id=user_id,
-            chat_id=chat_id,
-            initial_content=content,
-        )
-        self.update_chat_metadata(user_id=user_id, chat_id=chat_id, content=content)
-        return self.append_message(
+        return self._save_chat_message(
             user_id=user_id,
             chat_id=chat_id,
             message=MessagePayload(
@@ -227,13 +271,7 @@ class ChatPersistenceService:
         message_id: Optional[str] = None,
         client_message_id: Optional[str] = None,
     ) -> str:
-        self.ensure_chat_document(
-            user_id=user_id,
-            chat_id=chat_id,
-            initial_content=content,
-        )
-        self.update_chat_metadata(user_id=user_id, chat_id=chat_id, content=content)
-        return self.append_message(
+        return self._save_chat_message(
             user_id=user_id,
             chat_id=chat_id,
             message=MessagePayload(
@@ -1,50 +1,145 @@
 import logging
+import os
+import signal
 import subprocess
-import tempfile
 from pathlib import Path
-from typing import Tuple
+from typing import List, Sequence, Tuple
+
+from core.scratch import scratch_dir
+from core.word_to_pdf.listener import _signal_group, get_listener
 
 logger = logging.getLogger("pdf_read_refresh.core.word_to_pdf")
 
 
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# Per-input budget: small decks fail fast on a hang, large ones still get time to render.
+SOFFICE_TIMEOUT_BASE = _env_float("SOFFICE_TIMEOUT_BASE", 20.0)
+SOFFICE_TIMEOUT_PER_MB = _env_float("SOFFICE_TIMEOUT_PER_MB", 2.0)
+# Grace period between SIGTERM and SIGKILL for a timed-out soffice.
+_SOFFICE_KILL_GRACE = 2.0
+
+
+def convert_timeout(srcs: Sequence[Path]) -> float:
+    total_mb = sum(src.stat().st_size for src in srcs) / 1_000_000
+    return SOFFICE_TIMEOUT_BASE * len(srcs) + SOFFICE_TIMEOUT_PER_MB * total_mb
+
+
+def convert_word_file_to_pdf_file(src: Path, outdir: Path) -> Path:
+    """
+    Convert a Word-like document on disk into a PDF inside `outdir` using LibreOffice.
+    Uses the process' warm listener when available, otherwise a one-shot soffice run.
+    Returns the path of the produced PDF.
+    """
+    listener = get_listener()
+    if listener is not None:
+        try:
+            pdf_path = listener.convert(src, outdir, timeout=convert_timeout([src]))
+            logger.info(
+                "LibreOffice listener convert success",
+                extra={"output_pdf": str(pdf_path), "size": pdf_path.stat().st_size},
+            )
+            return pdf_path
+        except Exception as exc:
+            logger.warning("LibreOffice listener convert failed, falling back to soffice", extra={"error": str(exc)})
+    return _convert_with_soffice(src, outdir)
+
+
+def _convert_with_soffice(src: Path, outdir: Path) -> Path:
+    return _convert_batch_with_soffice([src], outdir)[0]
+
+
+def _run_soffice(cmd: List[str], timeout: float) -> Tuple[int, bytes, bytes]:
+    """
+    Run soffice in its own process group. On timeout the whole group gets SIGTERM, then SIGKILL,
+    so no soffice.bin survives a hang; the group is swept once more after every run.
+    """
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    except Exception as exc:
+        logger.error("LibreOffice spawn failed", extra={"error": str(exc)})
+        raise RuntimeError(f"LibreOffice conversion failed: {exc}") from exc
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _signal_group(process, signal.SIGTERM)
+        try:
+            process.communicate(timeout=_SOFFICE_KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            _signal_group(process, signal.SIGKILL)
+            process.communicate()
+        # rc=-9 means soffice ignored SIGTERM and had to be killed.
+        logger.error("LibreOffice convert timed out", extra={"rc": process.returncode, "timeout": round(timeout, 1)})
+        raise TimeoutError(f"LibreOffice conversion timed out after {timeout:.0f}s rc={process.returncode}")
+    finally:
+        _signal_group(process, signal.SIGKILL)
+        process.wait()
+    return process.returncode, stdout, stderr
+
+
+def _convert_batch_with_soffice(srcs: Sequence[Path], outdir: Path) -> List[Path]:
+    """One soffice invocation for every input; inputs must have distinct stems."""
+    cmd = [
+        "soffice",
+        "--headless",
+        "--convert-to",
+        "pdf",
+        "--outdir",
+        str(outdir),
+        *(str(src) for src in srcs),
+    ]
+    profile_dir = os.getenv("UNO_USER_DIR")
+    if profile_dir:
+        # Concurrent soffice processes sharing one profile serialise (or hang) on its lock.
+        cmd.insert(1, f"-env:UserInstallation={Path(profile_dir).as_uri()}")
+    logger.info(
+        "LibreOffice convert start",
+        extra={"cmd": " ".join(cmd), "tmpdir": str(outdir), "suffix": srcs[0].suffix, "count": len(srcs)},
+    )
+    returncode, stdout, stderr = _run_soffice(cmd, convert_timeout(srcs))
+
+    stderr_preview = stderr.decode("utf-8", errors="ignore")[:400] if stderr else ""
+    stdout_preview = stdout.decode("utf-8", errors="ignore")[:200] if stdout else ""
+    logger.info(
+        "LibreOffice convert finished",
+        extra={"rc": returncode, "stdout": stdout_preview, "stderr": stderr_preview},
+    )
+    if returncode != 0:
+        raise RuntimeError(f"LibreOffice conversion failed rc={returncode} stderr={stderr_preview}")
+
+    pdf_paths = [Path(outdir) / f"{src.stem}.pdf" for src in srcs]
+    for pdf_path in pdf_paths:
+        if not pdf_path.exists():
+            raise RuntimeError("LibreOffice conversion failed: no PDF output produced")
+        logger.info("LibreOffice convert success", extra={"output_pdf": str(pdf_path), "size": pdf_path.stat().st_size})
+    return pdf_paths
+
+
 def convert_word_bytes_to_pdf_bytes(content: bytes, suffix: str = ".docx") -> Tuple[bytes, str]:
     """
     Convert a Word-like document (doc/docx) into PDF bytes using LibreOffice.
+    The input and output files live in a scratch dir on tmpfs while it has room for both.
     Returns (pdf_bytes, pdf_filename).
     """
-    with tempfile.TemporaryDirectory() as tmpdir:
+    # Room for the input and a PDF of about the same size.
+    with scratch_dir("word_to_pdf_", reserve_bytes=2 * len(content)) as tmpdir:
         tmp_in = Path(tmpdir) / f"input{suffix}"
         tmp_in.write_bytes(content)
+        pdf_path = convert_word_file_to_pdf_file(tmp_in, Path(tmpdir))
+        return pdf_path.read_bytes(), pdf_path.name
 
-        cmd = [
-            "soffice",
-            "--headless",
-            "--convert-to",
-            "pdf",
-            "--outdir",
-            str(tmpdir),
-            str(tmp_in),
-        ]
-        logger.info("LibreOffice convert start", extra={"cmd": " ".join(cmd), "tmpdir": tmpdir, "suffix": suffix})
-        try:
-            result = subprocess.run(cmd, capture_output=True, timeout=60)
-        except Exception as exc:
-            logger.error("LibreOffice spawn failed", extra={"error": str(exc)})
-            raise RuntimeError(f"LibreOffice conversion failed: {exc}") from exc
-
-        stderr_preview = result.stderr.decode("utf-8", errors="ignore")[:400] if result.stderr else ""
-        stdout_preview = result.stdout.decode("utf-8", errors="ignore")[:200] if result.stdout else ""
-        logger.info(
-            "LibreOffice convert finished",
-            extra={"rc": result.returncode, "stdout": stdout_preview, "stderr": stderr_preview},
-        )
-        if result.returncode != 0:
-            raise RuntimeError(f"LibreOffice conversion failed rc={result.returncode} stderr={stderr_preview}")
-
-        pdf_path = next(iter(Path(tmpdir).glob("*.pdf")), None)
-        if not pdf_path or not pdf_path.exists():
-            raise RuntimeError("LibreOffice conversion failed: no PDF output produced")
 
-        size = pdf_path.stat().st_size
-        logger.info("LibreOffice convert success", extra={"output_pdf": str(pdf_path), "size": size})
-        return pdf_path.read_bytes(), pdf_path.name
+def convert_word_files_to_pdf_files(srcs: Sequence[Path], outdir: Path) -> List[Path]:
+    """
+    Convert several documents at once, paying LibreOffice start-up a single time.
+    Inputs must have distinct stems; returns the PDF paths in input order.
+    """
+    if get_listener() is not None:
+        # A warm office has no start-up to amortise; convert one by one through it.
+        return [convert_word_file_to_pdf_file(src, outdir) for src in srcs]
+    return _convert_batch_with_soffice(srcs, outdir)
@@ -0,0 +1,188 @@
+import atexit
+import logging
+import multiprocessing.util
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import xmlrpc.client
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("pdf_read_refresh.core.word_to_pdf.listener")
+
+UNOSERVER_BIN = os.getenv("UNOSERVER_BIN", "unoserver")
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _signal_group(process: subprocess.Popen, sig: int) -> None:
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class _TimeoutTransport(xmlrpc.client.Transport):
+    def __init__(self, timeout: float) -> None:
+        super().__init__()
+        self._timeout = timeout
+
+    def make_connection(self, host):  # type: ignore[override]
+        conn = super().make_connection(host)
+        conn.timeout = self._timeout
+        return conn
+
+
+class LibreOfficeListener:
+    """
+    A warm soffice instance behind unoserver's XML-RPC API, owned by a single process.
+    Conversions reuse the running office instead of paying its start-up on every call;
+    the instance is restarted when it dies and recycled after `recycle_after` conversions
+    to keep LibreOffice's slow memory growth in check.
+    """
+
+    def __init__(self, profile_dir: str, recycle_after: int, start_timeout: float = 30.0) -> None:
+        self.profile_dir = profile_dir
+        self.recycle_after = recycle_after
+        self.start_timeout = start_timeout
+        self.port: Optional[int] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.conversions = 0
+        self._lock = threading.Lock()
+
+    def _proxy(self, timeout: float) -> xmlrpc.client.ServerProxy:
+        return xmlrpc.client.ServerProxy(
+            f"http://127.0.0.1:{self.port}",
+            allow_none=True,
+            transport=_TimeoutTransport(timeout),
+        )
+
+    def healthy(self) -> bool:
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            self._proxy(5.0).info()
+            return True
+        except Exception:
+            return False
+
+    def start(self) -> None:
+        self.port = _free_port()
+        cmd = [
+            UNOSERVER_BIN,
+            "--interface",
+            "127.0.0.1",
+            "--port",
+            str(self.port),
+            "--uno-port",
+            str(_free_port()),
+            "--user-installation",
+            self.profile_dir,
+        ]
+        logger.info("LibreOffice listener start", extra={"cmd": " ".join(cmd)})
+        # Own process group: unoserver's soffice child must go down with it, even after a SIGKILL.
+        self.process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        self.conversions = 0
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            if self.healthy():
+                logger.info("LibreOffice listener ready", extra={"port": self.port, "pid": self.process.pid})
+                return
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.25)
+        self.stop()
+        raise RuntimeError("LibreOffice listener did not become ready")
+
+    def stop(self) -> None:
+        process, self.process = self.process, None
+        if process is None:
+            return
+        # Signal the whole group: a hung or already-dead unoserver would otherwise orphan soffice.
+        _signal_group(process, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _signal_group(process, signal.SIGKILL)
+            process.wait()
+        else:
+            _signal_group(process, signal.SIGKILL)
+
+    def convert(self, src: Path, outdir: Path, timeout: float = 60.0) -> Path:
+        """Convert `src` to `outdir/<stem>.pdf` through the warm office; raises on failure."""
+        with self._lock:
+            if not self.healthy():
+                self.stop()
+                self.start()
+            pdf_path = Path(outdir) / f"{src.stem}.pdf"
+            try:
+                # Positional arguments match unoserver's convert() in both the 2.x and 3.x APIs.
+                self._proxy(timeout).convert(str(src), None, str(pdf_path), "pdf", None, [], False, None)
+            except Exception:
+                self.stop()
+                raise
+            self.conversions += 1
+            if self.conversions >= self.recycle_after:
+                logger.info("LibreOffice listener recycle", extra={"conversions": self.conversions})
+                self.stop()
+            if not pdf_path.exists():
+                raise RuntimeError("LibreOffice listener produced no PDF output")
+            return pdf_path
+
+
+_LISTENER: Optional[LibreOfficeListener] = None
+_LISTENER_DISABLED = False
+
+
+def get_listener() -> Optional[LibreOfficeListener]:
+    """
+    Per-process listener, or None when disabled (SOFFICE_LISTENER=0), unoserver is not
+    installed, or it failed to start once already; callers then fall back to one-shot soffice.
+    """
+    global _LISTENER, _LISTENER_DISABLED
+    if _LISTENER is not None or _LISTENER_DISABLED:
+        return _LISTENER
+    if not _env_flag("SOFFICE_LISTENER", "1") or shutil.which(UNOSERVER_BIN) is None:
+        _LISTENER_DISABLED = True
+        return None
+    profile_dir = os.getenv("UNO_USER_DIR") or os.path.join(tempfile.gettempdir(), f"lo_listener_{os.getpid()}")
+    listener = LibreOfficeListener(profile_dir, recycle_after=max(_env_int("SOFFICE_RECYCLE_AFTER", 200), 1))
+    try:
+        listener.start()
+    except Exception as exc:
+        logger.warning("LibreOffice listener unavailable, using one-shot soffice", extra={"error": str(exc)})
+        _LISTENER_DISABLED = True
+        return None
+    atexit.register(listener.stop)
+    # Pool workers leave through multiprocessing, which skips atexit but runs its own finalizers.
+    multiprocessing.util.Finalize(listener, listener.stop, exitpriority=10)
+    _LISTENER = listener
+    return listener
+
+
+__all__ = ["LibreOfficeListener", "get_listener"]
@@ -99,9 +99,9 @@ async def analyze_pdf(payload: PdfAnalyzeRequest, request: Request) -> Dict[str,
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "PDF analyze gemini response | chatId=%s preview=%s",
+            "PDF analyze gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         base_payload = {
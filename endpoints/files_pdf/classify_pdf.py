@@ -115,7 +115,7 @@ async def classify_pdf(payload: PdfClassifyRequest, request: Request) -> Dict[st
         )
         if not classification:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF classify gemini response | chatId=%s preview=%s", payload.chat_id, classification[:500])
+        logger.info("PDF classify gemini response | chatId=%s preview=%.500s", payload.chat_id, classification)
 
         extra_fields = {
             "success": True,
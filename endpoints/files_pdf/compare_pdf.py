@@ -125,9 +125,9 @@ async def compare_pdf(payload: PdfCompareRequest, request: Request) -> Dict[str,
         if not diff:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "PDF compare gemini response | chatId=%s preview=%s",
+            "PDF compare gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            diff[:500],
+            diff,
         )
 
         extra_fields = {
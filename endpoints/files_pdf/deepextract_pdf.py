@@ -104,7 +104,7 @@ async def deepextract_pdf(payload: PdfDeepExtractRequest, request: Request) -> D
         )
         if not extracted:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF deepextract gemini response | chatId=%s preview=%s", payload.chat_id, extracted[:500])
+        logger.info("PDF deepextract gemini response | chatId=%s preview=%.500s", payload.chat_id, extracted)
 
         extra_fields = {
             "success": True,
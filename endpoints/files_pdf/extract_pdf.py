@@ -94,7 +94,7 @@ async def extract_pdf(payload: PdfExtractRequest, request: Request) -> Dict[str,
         )
         if not extraction:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF extract gemini response | chatId=%s preview=%s", payload.chat_id, extraction[:500])
+        logger.info("PDF extract gemini response | chatId=%s preview=%.500s", payload.chat_id, extraction)
 
         extra_fields = {
             "success": True,
@@ -94,7 +94,7 @@ async def grounded_search_pdf(payload: PdfGroundedSearchRequest, request: Reques
         )
         if not answer:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF grounded_search gemini response | chatId=%s preview=%s", payload.chat_id, answer[:500])
+        logger.info("PDF grounded_search gemini response | chatId=%s preview=%.500s", payload.chat_id, answer)
 
         extra_fields = {
             "success": True,
@@ -94,7 +94,7 @@ async def layout_pdf(payload: PdfLayoutRequest, request: Request) -> Dict[str, A
         )
         if not layout_info:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF layout gemini response | chatId=%s preview=%s", payload.chat_id, layout_info[:500])
+        logger.info("PDF layout gemini response | chatId=%s preview=%.500s", payload.chat_id, layout_info)
 
         extra_fields = {
             "success": True,
@@ -90,7 +90,7 @@ async def multianalyze_pdf(payload: PdfMultiAnalyzeRequest, request: Request) ->
         )
         if not text:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF multianalyze gemini response | chatId=%s preview=%s", payload.chat_id, text[:500])
+        logger.info("PDF multianalyze gemini response | chatId=%s preview=%.500s", payload.chat_id, text)
 
         base_payload = {
             "success": True,
@@ -94,7 +94,7 @@ async def ocr_extract_pdf(payload: PdfOcrExtractRequest, request: Request) -> Di
         )
         if not text:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF ocr_extract gemini response | chatId=%s preview=%s", payload.chat_id, text[:500])
+        logger.info("PDF ocr_extract gemini response | chatId=%s preview=%.500s", payload.chat_id, text)
 
         extra_fields = {
             "success": True,
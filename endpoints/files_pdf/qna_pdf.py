@@ -108,7 +108,7 @@ async def qna_pdf(payload: PdfQnaRequest, request: Request) -> Dict[str, Any]:
         )
         if not answer:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF qna gemini response | chatId=%s preview=%s", payload.chat_id, answer[:500])
+        logger.info("PDF qna gemini response | chatId=%s preview=%.500s", payload.chat_id, answer)
 
         extra_fields = {
             "success": True,
@@ -95,7 +95,7 @@ async def rewrite_pdf(payload: PdfRewriteRequest, request: Request) -> Dict[str,
         )
         if not rewritten:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF rewrite gemini response | chatId=%s preview=%s", payload.chat_id, rewritten[:500])
+        logger.info("PDF rewrite gemini response | chatId=%s preview=%.500s", payload.chat_id, rewritten)
 
         extra_fields = {
             "success": True,
@@ -94,7 +94,7 @@ async def structure_export_pdf(payload: PdfStructureExportRequest, request: Requ
         )
         if not structure:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF structure_export gemini response | chatId=%s preview=%s", payload.chat_id, structure[:500])
+        logger.info("PDF structure_export gemini response | chatId=%s preview=%.500s", payload.chat_id, structure)
 
         extra_fields = {
             "success": True,
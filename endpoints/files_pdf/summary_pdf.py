@@ -96,7 +96,7 @@ async def summary_pdf(payload: PdfSummaryRequest, request: Request) -> Dict[str,
         )
         if not text:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF summary gemini response | chatId=%s preview=%s", payload.chat_id, text[:500])
+        logger.info("PDF summary gemini response | chatId=%s preview=%.500s", payload.chat_id, text)
 
         response_message_id = (
             stream_message_id
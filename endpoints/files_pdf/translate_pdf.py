@@ -102,7 +102,7 @@ async def translate_pdf(payload: PdfTranslateRequest, request: Request) -> Dict[
         )
         if not translation:
             raise RuntimeError("Empty response from Gemini")
-        logger.info("PDF translate gemini response | chatId=%s preview=%s", payload.chat_id, translation[:500])
+        logger.info("PDF translate gemini response | chatId=%s preview=%.500s", payload.chat_id, translation)
 
         extra_fields = {
             "success": True,
@@ -1,20 +1,26 @@
 import asyncio
 import base64
 import logging
+import math
 import re
 import json
 import os
 import uuid
 import time
 from uuid import uuid4 as _uuid4
-from typing import Any, AsyncGenerator, Dict, Generator, Optional, Tuple
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, ContextManager, Dict, Iterable, Optional, Tuple, TypeVar, Union
 
+import httpx
 import requests
 import firebase_admin
 from firebase_admin import firestore
 from fastapi import HTTPException, Request
 
+from core.gemini_config import get_gemini_config
+from core.gemini_rate_limit import GeminiKeyLimiter, GeminiQuotaExceeded, gemini_limiter
 from core.language_support import normalize_language
+from core.scratch import scratch_dir
 from core.firebase import db
 from core.gemini_prompt import build_system_message, merge_parts_with_system
 from core.tone_instructions import ToneKey
@@ -34,6 +40,9 @@ logger = logging.getLogger("pdf_read_refresh.files_pdf.utils")
 
 
 def log_full_payload(logger_obj: logging.Logger, name: str, payload_obj: Any) -> None:
+    # The full request dump (model_dump + pretty JSON) is a debugging aid; skip it unless DEBUG is on.
+    if not logger_obj.isEnabledFor(logging.DEBUG):
+        return
     log_request(logger_obj, name, payload_obj)
 
 
@@ -76,26 +85,166 @@ def build_usage_context(
 
 def download_file(url: str, max_mb: int, require_pdf: bool = True) -> Tuple[bytes, str]:
     if not url.lower().startswith(("http://", "https://")):
-        raise HTTPException(
-            status_code=400,
-            detail={"success": False, "error": "invalid_file_url", "message": get_pdf_error_message("invalid_file_url", None)},
-        )
-    resp = requests.get(url, timeout=60)
-    if not resp.ok or not resp.content:
-        raise HTTPException(
-            status_code=400,
-            detail={"success": False, "error": "file_download_failed", "message": get_pdf_error_message("file_download_failed", None)},
-        )
-    content = resp.content
-    if len(content) > max_mb * 1024 * 1024:
-        raise HTTPException(
-            status_code=400,
-            detail={"success": False, "error": "file_too_large", "message": get_pdf_error_message("file_too_large", None)},
+        raise _http_error(400, "invalid_file_url")
+    max_bytes = max_mb * 1024 * 1024
+    chunks: list[bytes] = []
+    size = 0
+    # Streamed so an oversize body is refused on its Content-Length, or as soon as it passes
+    # max_mb, instead of after the whole response has been read into memory.
+    with requests.get(url, timeout=60, stream=True) as resp:
+        if not resp.ok:
+            raise _http_error(400, "file_download_failed")
+        declared = resp.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise _http_error(400, "file_too_large")
+        for chunk in resp.iter_content(65536):
+            size += len(chunk)
+            if size > max_bytes:
+                raise _http_error(400, "file_too_large")
+            chunks.append(chunk)
+        mime = resp.headers.get("Content-Type", "application/pdf").split(";")[0].strip()
+    if not size:
+        raise _http_error(400, "file_download_failed")
+    if require_pdf and "pdf" not in mime:
+        mime = "application/pdf"
+    return b"".join(chunks), mime
+
+
+_ASYNC_HTTP_CLIENT: Optional[httpx.AsyncClient] = None
+GEMINI_API_ORIGIN = "https://generativelanguage.googleapis.com/"
+_T = TypeVar("_T")
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Process-wide HTTP/2 client so downloads and Gemini uploads reuse pooled connections."""
+    global _ASYNC_HTTP_CLIENT
+    if _ASYNC_HTTP_CLIENT is None or _ASYNC_HTTP_CLIENT.is_closed:
+        _ASYNC_HTTP_CLIENT = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=200),
+            timeout=httpx.Timeout(60.0),
+            follow_redirects=True,
         )
-    mime = resp.headers.get("Content-Type", "application/pdf").split(";")[0].strip()
+    return _ASYNC_HTTP_CLIENT
+
+
+async def warm_async_http_client(urls: Iterable[str]) -> None:
+    """Open pooled connections to `urls` ahead of the first request; failures are only logged."""
+    client = get_async_http_client()
+    for url in urls:
+        try:
+            await client.head(url, timeout=10.0)
+        except httpx.HTTPError as exc:
+            logger.info("HTTP warm-up skipped", extra={"url": url, "error": str(exc)})
+
+
+async def with_gemini_connection_warm(work: Awaitable[_T]) -> _T:
+    """
+    Await `work` (typically a LibreOffice conversion) while the Gemini connection is checked and,
+    if it went idle, re-opened alongside it, so the upload that follows skips the handshake.
+    """
+    warmup = asyncio.create_task(warm_async_http_client([GEMINI_API_ORIGIN]))
+    try:
+        result = await work
+    except BaseException:
+        warmup.cancel()
+        raise
+    await warmup
+    return result
+
+
+async def close_async_http_client() -> None:
+    global _ASYNC_HTTP_CLIENT
+    client, _ASYNC_HTTP_CLIENT = _ASYNC_HTTP_CLIENT, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def _http_error(status_code: int, error_key: str) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={"success": False, "error": error_key, "message": get_pdf_error_message(error_key, None)},
+    )
+
+
+def _reject_declared_oversize(resp: httpx.Response, max_bytes: int) -> None:
+    # A declared Content-Length over the cap fails before any of the body is read.
+    declared = resp.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise _http_error(400, "file_too_large")
+
+
+async def async_download_file(url: str, max_mb: int, require_pdf: bool = True) -> Tuple[bytes, str]:
+    """Non-blocking download_file: streams the body and stops as soon as it exceeds max_mb."""
+    if not url.lower().startswith(("http://", "https://")):
+        raise _http_error(400, "invalid_file_url")
+    max_bytes = max_mb * 1024 * 1024
+    chunks: list[bytes] = []
+    size = 0
+    async with get_async_http_client().stream("GET", url) as resp:
+        if not resp.is_success:
+            raise _http_error(400, "file_download_failed")
+        _reject_declared_oversize(resp, max_bytes)
+        async for chunk in resp.aiter_bytes(65536):
+            size += len(chunk)
+            if size > max_bytes:
+                raise _http_error(400, "file_too_large")
+            chunks.append(chunk)
+        mime = resp.headers.get("Content-Type", "application/pdf").split(";")[0].strip()
+    if not size:
+        raise _http_error(400, "file_download_failed")
     if require_pdf and "pdf" not in mime:
         mime = "application/pdf"
-    return content, mime
+    return b"".join(chunks), mime
+
+
+def scratch_tempdir(prefix: str, reserve_mb: int = 0) -> ContextManager[str]:
+    """
+    Temporary directory for download/convert/upload scratch files, on tmpfs only while it has room
+    for `reserve_mb` on top of every other scratch dir in flight.
+    """
+    return scratch_dir(prefix, reserve_mb * 1024 * 1024)
+
+
+DOWNLOAD_WRITE_BUFFER = 1024 * 1024
+
+
+async def async_download_file_to_path(
+    url: str, dest: Union[str, Path], max_mb: int, require_pdf: bool = True
+) -> Tuple[int, str]:
+    """
+    Stream `url` straight into `dest` instead of buffering the body in memory.
+    Returns (size_in_bytes, mime); enforces the same checks as download_file.
+    """
+    if not url.lower().startswith(("http://", "https://")):
+        raise _http_error(400, "invalid_file_url")
+    max_bytes = max_mb * 1024 * 1024
+    size = 0
+    pending: list[bytes] = []
+    pending_size = 0
+    with open(dest, "wb") as fh:
+        async with get_async_http_client().stream("GET", url) as resp:
+            if not resp.is_success:
+                raise _http_error(400, "file_download_failed")
+            _reject_declared_oversize(resp, max_bytes)
+            async for chunk in resp.aiter_bytes(65536):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _http_error(400, "file_too_large")
+                pending.append(chunk)
+                pending_size += len(chunk)
+                # One worker-thread write per ~1 MiB instead of one per network chunk.
+                if pending_size >= DOWNLOAD_WRITE_BUFFER:
+                    await asyncio.to_thread(fh.writelines, pending)
+                    pending, pending_size = [], 0
+            if pending:
+                await asyncio.to_thread(fh.writelines, pending)
+            mime = resp.headers.get("Content-Type", "application/pdf").split(";")[0].strip()
+    if not size:
+        raise _http_error(400, "file_download_failed")
+    if require_pdf and "pdf" not in mime:
+        mime = "application/pdf"
+    return size, mime
 
 
 def _strip_markdown_stars(text: Optional[str]) -> str:
@@ -190,9 +339,148 @@ def upload_to_gemini_files(content: bytes, mime_type: str, display_name: str, ap
     return file_uri
 
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def iter_file_chunks(path: Union[str, Path], chunk_size: int = UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield a file's content chunk by chunk; reads run in a worker thread so the loop never blocks on disk."""
+    with open(path, "rb") as fh:
+        while True:
+            chunk = await asyncio.to_thread(fh.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def _upload_to_gemini_async(
+    body: Union[bytes, AsyncIterator[bytes]],
+    size: int,
+    mime_type: str,
+    display_name: str,
+    api_key: str,
+) -> str:
+    """
+    Gemini resumable upload through the shared HTTP/2 client: one start call, then a single
+    "upload, finalize" request whose body is either bytes or streamed from an async iterator.
+    """
+    if not api_key:
+        raise HTTPException(
+            status_code=500,
+            detail={"success": False, "error": "gemini_api_key_missing", "message": "GEMINI_API_KEY env is required"},
+        )
+    client = get_async_http_client()
+
+    start_url = f"https://generativelanguage.googleapis.com/upload/v1beta/files?key={api_key}"
+    start_headers = {
+        "X-Goog-Upload-Protocol": "resumable",
+        "X-Goog-Upload-Command": "start",
+        "X-Goog-Upload-Header-Content-Length": str(size),
+        "X-Goog-Upload-Header-Content-Type": mime_type,
+        "Content-Type": "application/json",
+    }
+    start_payload = {"file": {"display_name": display_name}}
+    log_gemini_request(logger, "gemini_files_start", url=start_url, payload=start_payload, method="POST")
+    start_resp = await client.post(start_url, headers=start_headers, json=start_payload, timeout=30)
+    log_gemini_response(
+        logger,
+        "gemini_files_start",
+        url=start_url,
+        status_code=start_resp.status_code,
+        response={"headers": dict(start_resp.headers)},
+    )
+    if not start_resp.is_success:
+        logger.error("Gemini Files start failed", extra={"status": start_resp.status_code, "body": start_resp.text[:500]})
+        raise _http_error(500, "upload_failed")
+    upload_url = start_resp.headers.get("X-Goog-Upload-URL")
+    if not upload_url:
+        raise _http_error(500, "upload_failed")
+
+    upload_headers = {
+        "X-Goog-Upload-Command": "upload, finalize",
+        "X-Goog-Upload-Offset": "0",
+        "Content-Type": mime_type,
+        "Content-Length": str(size),
+    }
+    log_gemini_request(
+        logger,
+        "gemini_files_upload",
+        url=upload_url,
+        payload={"content_length": size, "mime_type": mime_type},
+        method="POST",
+    )
+    upload_resp = await client.post(upload_url, headers=upload_headers, content=body, timeout=120)
+    upload_json = upload_resp.json() if upload_resp.text else {}
+    log_gemini_response(
+        logger,
+        "gemini_files_upload",
+        url=upload_url,
+        status_code=upload_resp.status_code,
+        response=upload_json,
+    )
+    if not upload_resp.is_success:
+        logger.error("Gemini Files upload failed", extra={"status": upload_resp.status_code, "body": upload_resp.text[:500]})
+        raise _http_error(500, "upload_failed")
+    file_uri = upload_json.get("file", {}).get("uri") or upload_json.get("uri")
+    if not file_uri:
+        raise _http_error(500, "upload_failed")
+    return file_uri
+
+
+async def upload_to_gemini_files_async(content: bytes, mime_type: str, display_name: str, api_key: str) -> str:
+    """Async counterpart of upload_to_gemini_files using the shared HTTP/2 client."""
+    return await _upload_to_gemini_async(content, len(content), mime_type, display_name, api_key)
+
+
+async def upload_stream_to_gemini_async(
+    chunks: AsyncIterator[bytes],
+    size: int,
+    mime_type: str,
+    display_name: str,
+    api_key: str,
+) -> str:
+    """Upload `size` bytes produced by `chunks` without ever holding the whole payload in memory."""
+    return await _upload_to_gemini_async(chunks, size, mime_type, display_name, api_key)
+
+
+async def upload_file_to_gemini_async(path: Union[str, Path], mime_type: str, display_name: str, api_key: str) -> str:
+    size = os.stat(path).st_size
+    return await upload_stream_to_gemini_async(iter_file_chunks(path), size, mime_type, display_name, api_key)
+
+
+async def gemini_file_is_active(file_uri: str, api_key: str) -> bool:
+    """True when the Files API still reports `file_uri` as ACTIVE; any failure counts as not active."""
+    client = get_async_http_client()
+    try:
+        resp = await client.get(file_uri, params={"key": api_key}, timeout=10)
+    except httpx.HTTPError as exc:
+        logger.warning("Gemini file state check failed", extra={"fileUri": file_uri, "error": str(exc)})
+        return False
+    if not resp.is_success:
+        return False
+    return resp.json().get("state") == "ACTIVE"
+
+
+async def create_gemini_cached_content(file_uri: str, model: Optional[str], api_key: str, *, ttl_seconds: int) -> str:
+    """Create a cachedContents entry holding the PDF at `file_uri` for `model`; returns its name."""
+    client = get_async_http_client()
+    resp = await client.post(
+        "https://generativelanguage.googleapis.com/v1beta/cachedContents",
+        params={"key": api_key},
+        json={
+            "model": _normalize_model_name(_effective_pdf_model(model)),
+            "contents": [{"role": "user", "parts": [{"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}}]}],
+            "ttl": f"{ttl_seconds}s",
+        },
+        timeout=60,
+    )
+    if not resp.is_success:
+        raise RuntimeError(f"Gemini cachedContents create failed: {resp.status_code} {resp.text[:300]}")
+    return resp.json()["name"]
+
+
 def _effective_pdf_model(model: Optional[str]) -> str:
     # Öncelik: param > env > güncel canlı fallback
-    return model or os.getenv("GEMINI_PDF_MODEL") or "models/gemini-3-flash-preview"
+    return model or get_gemini_config().pdf_model_env or "models/gemini-3-flash-preview"
 
 
 def _normalize_model_name(model: str) -> str:
@@ -202,6 +490,13 @@ def _normalize_model_name(model: str) -> str:
     return f"models/{model}"
 
 
+def build_pdf_parts(file_uris: Iterable[str], *texts: Optional[str]) -> list[Dict[str, Any]]:
+    """Build Gemini parts: one PDF file_data part per uri followed by the non-empty text parts, in order."""
+    parts: list[Dict[str, Any]] = [{"file_data": {"mime_type": "application/pdf", "file_uri": uri}} for uri in file_uris]
+    parts.extend({"text": text} for text in texts if text)
+    return parts
+
+
 def _normalize_parts_for_office(parts: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
     """
     If a part has file_data and only file_uri, leave as is (no forced mime).
@@ -219,12 +514,14 @@ def _normalize_parts_for_office(parts: list[Dict[str, Any]]) -> list[Dict[str, A
     return normalized
 
 
-def call_gemini_generate(
+def _gemini_generate_request(
     parts: list[Dict[str, Any]],
     api_key: str,
-    model: Optional[str] = None,
-    system_instruction: Optional[str] = None,
-) -> Dict[str, Any]:
+    model: Optional[str],
+    system_instruction: Optional[str],
+    cached_content: Optional[str],
+) -> Tuple[str, Dict[str, Any], str]:
+    """URL, payload and model of a generateContent call."""
     if not api_key:
         raise HTTPException(
             status_code=500,
@@ -235,7 +532,9 @@ def call_gemini_generate(
     # Belirtilen istek: v1beta + models/<name>
     url = f"https://generativelanguage.googleapis.com/v1beta/{effective_model}:generateContent?key={api_key}"
     effective_parts = merge_parts_with_system(parts, system_instruction)
-    payload = {"contents": [{"role": "user", "parts": effective_parts}]}
+    payload: Dict[str, Any] = {"contents": [{"role": "user", "parts": effective_parts}]}
+    if cached_content:
+        payload["cachedContent"] = cached_content
     log_gemini_request(
         logger,
         "gemini_doc_generate",
@@ -243,28 +542,101 @@ def call_gemini_generate(
         payload=payload,
         model=effective_model,
     )
-    resp = requests.post(url, json=payload, timeout=180)
-    response_json = resp.json() if resp.text else {}
+    return url, payload, effective_model
+
+
+_RETRY_DELAY_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)s\s*$")
+
+
+def _retry_after_headers(status_code: int, headers: httpx.Headers, body_text: str) -> Optional[Dict[str, str]]:
+    """Retry-After for a 429, from the response header or the RetryInfo detail in Gemini's error body."""
+    if status_code != 429:
+        return None
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        try:
+            details = (json.loads(body_text).get("error") or {}).get("details") or []
+        except (ValueError, AttributeError):
+            details = []
+        for detail in details:
+            match = isinstance(detail, dict) and _RETRY_DELAY_RE.match(str(detail.get("retryDelay") or ""))
+            if match:
+                retry_after = match.group(1)
+                break
+    return {"Retry-After": retry_after} if retry_after else None
+
+
+def gemini_retry_after(exc: Exception) -> Optional[float]:
+    """Seconds a Gemini 429 asked the caller to wait, or None when it did not say."""
+    headers = getattr(exc, "headers", None) or {}
+    try:
+        return float(headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+# Limiter charge before Gemini reports usage: prompt text at ~4 characters per token plus a
+# ten-page document (258 tokens per page) per attached file; corrected from usageMetadata afterwards.
+_FILE_PART_EST_TOKENS = 10 * 258
+
+
+def _estimate_request_tokens(parts: list[Dict[str, Any]]) -> int:
+    tokens = 0
+    for part in parts:
+        text = part.get("text")
+        tokens += len(text) // 4 if isinstance(text, str) else _FILE_PART_EST_TOKENS
+    return tokens
+
+
+async def _acquire_gemini_quota(api_key: str, est_tokens: int) -> GeminiKeyLimiter:
+    """Wait for room on the key's limiter; a wait past its budget surfaces as a 429 with Retry-After."""
+    limiter = gemini_limiter(api_key)
+    try:
+        await limiter.acquire(est_tokens)
+    except GeminiQuotaExceeded as exc:
+        logger.warning("Gemini key quota busy", extra={"retryAfter": round(exc.retry_after, 1)})
+        raise HTTPException(
+            status_code=429,
+            detail={"success": False, "error": "gemini_quota_busy", "message": get_pdf_error_message("gemini_doc_failed", None)},
+            headers={"Retry-After": str(math.ceil(exc.retry_after))},
+        ) from exc
+    return limiter
+
+
+def _penalize_on_quota(limiter: GeminiKeyLimiter, exc: HTTPException) -> None:
+    if exc.status_code == 429:
+        # Later requests on the key, including the caller's next attempt, wait this out.
+        limiter.penalize(gemini_retry_after(exc))
+
+
+def _gemini_generate_result(
+    url: str,
+    effective_model: str,
+    status_code: int,
+    body_text: str,
+    headers: httpx.Headers,
+) -> Dict[str, Any]:
+    response_json = json.loads(body_text) if body_text else {}
     log_gemini_response(
         logger,
         "gemini_doc_generate",
         url=url,
-        status_code=resp.status_code,
+        status_code=status_code,
         response=response_json,
     )
-    body_preview = (resp.text or "")[:800]
-    logger.info("Gemini doc request", extra={"status": resp.status_code, "model": effective_model, "body_preview": body_preview})
-    if not resp.ok:
+    body_preview = body_text[:800]
+    logger.info("Gemini doc request", extra={"status": status_code, "model": effective_model, "body_preview": body_preview})
+    if not 200 <= status_code < 300:
         logger.error(
             "Gemini doc request failed",
             extra={
-                "status": resp.status_code,
+                "status": status_code,
                 "model": effective_model,
                 "body": body_preview,
             },
         )
         raise HTTPException(
-            status_code=resp.status_code,
+            status_code=status_code,
             detail={
                 "success": False,
                 "error": "gemini_doc_failed",
@@ -272,26 +644,51 @@ def call_gemini_generate(
                 "body": body_preview,
                 "model": effective_model,
             },
+            headers=_retry_after_headers(status_code, headers, body_text),
         )
     return response_json
 
 
-def call_gemini_generate_stream(
+async def call_gemini_generate_async(
     parts: list[Dict[str, Any]],
     api_key: str,
     model: Optional[str] = None,
     system_instruction: Optional[str] = None,
-    usage_out: Optional[Dict[str, Any]] = None,
-) -> Generator[str, None, None]:
+    cached_content: Optional[str] = None,
+) -> Dict[str, Any]:
+    """generateContent on the shared HTTP/2 client, reusing its pooled connection to Gemini."""
+    url, payload, effective_model = _gemini_generate_request(parts, api_key, model, system_instruction, cached_content)
+    est_tokens = _estimate_request_tokens(parts)
+    limiter = await _acquire_gemini_quota(api_key, est_tokens)
+    resp = await get_async_http_client().post(url, json=payload, timeout=180)
+    try:
+        response_json = _gemini_generate_result(url, effective_model, resp.status_code, resp.text or "", resp.headers)
+    except HTTPException as exc:
+        _penalize_on_quota(limiter, exc)
+        raise
+    limiter.record_usage(est_tokens, extract_gemini_usage_metadata(response_json).get("totalTokenCount"))
+    return response_json
+
+
+def _gemini_stream_request(
+    parts: list[Dict[str, Any]],
+    api_key: str,
+    model: Optional[str],
+    system_instruction: Optional[str],
+    cached_content: Optional[str],
+) -> Tuple[str, Dict[str, Any], str]:
+    """URL, payload and model of a streamGenerateContent call."""
     if not api_key:
         raise HTTPException(
             status_code=500,
             detail={"success": False, "error": "gemini_api_key_missing", "message": "GEMINI_API_KEY env is required"},
         )
-    effective_model = _effective_pdf_model(model)
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{effective_model}:streamGenerateContent?alt=sse&key={api_key}"
+    effective_model = _normalize_model_name(_effective_pdf_model(model))
+    url = f"https://generativelanguage.googleapis.com/v1beta/{effective_model}:streamGenerateContent?alt=sse&key={api_key}"
     effective_parts = merge_parts_with_system(parts, system_instruction)
-    payload = {"contents": [{"role": "user", "parts": effective_parts}]}
+    payload: Dict[str, Any] = {"contents": [{"role": "user", "parts": effective_parts}]}
+    if cached_content:
+        payload["cachedContent"] = cached_content
     log_gemini_request(
         logger,
         "gemini_doc_stream_generate",
@@ -299,80 +696,72 @@ def call_gemini_generate_stream(
         payload=payload,
         model=effective_model,
     )
-    resp = requests.post(
-        url,
-        json=payload,
-        timeout=180,
-        stream=True,
-        headers={"Accept": "text/event-stream"},
+    return url, payload, effective_model
+
+
+def _gemini_stream_failed(status_code: int, body_text: str, headers: httpx.Headers) -> HTTPException:
+    logger.error(
+        "Gemini doc stream failed status=%s body=%s",
+        status_code,
+        body_text[:400],
     )
-    resp.encoding = "utf-8"
-    logger.info(
-        "Gemini doc stream request started status=%s model=%s",
-        resp.status_code,
-        effective_model,
+    return HTTPException(
+        status_code=status_code,
+        detail={"success": False, "error": "gemini_doc_failed", "message": get_pdf_error_message("gemini_doc_failed", None)},
+        headers=_retry_after_headers(status_code, headers, body_text),
     )
-    if not resp.ok:
-        body_preview = (resp.text or "")[:400]
-        logger.error(
-            "Gemini doc stream failed status=%s body=%s",
-            resp.status_code,
-            body_preview,
-        )
-        raise HTTPException(
-            status_code=resp.status_code,
-            detail={"success": False, "error": "gemini_doc_failed", "message": get_pdf_error_message("gemini_doc_failed", None)},
-        )
 
-    buffer: list[str] = []
 
-    def flush_buffer():
-        nonlocal buffer
-        if not buffer:
-            return
-        data_str = "\n".join(buffer).strip()
-        buffer.clear()
-        if not data_str:
-            return
-        try:
-            obj = json.loads(data_str)
-        except json.JSONDecodeError:
-            logger.debug("Gemini doc stream non-JSON event preview=%s", data_str[:200])
-            return
-        log_gemini_response(
-            logger,
-            "gemini_doc_stream_generate",
-            url=url,
-            status_code=resp.status_code,
-            response=obj,
-        )
-        usage = extract_gemini_usage_metadata(obj)
-        if usage_out is not None and usage:
-            usage_out.update(usage)
-        candidates = obj.get("candidates") or []
-        for candidate in candidates:
-            parts = (candidate.get("content") or {}).get("parts") or []
-            for part in parts:
-                text = part.get("text")
-                if isinstance(text, str) and text:
-                    yield text
+class _SSEEventBuffer:
+    """Collects SSE lines and hands back each event's data once its terminating blank line arrives."""
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
 
-    for raw_line in resp.iter_lines(decode_unicode=True):
-        line = raw_line if isinstance(raw_line, str) else raw_line.decode("utf-8", errors="ignore")
-        if line is None:
-            continue
+    def feed(self, line: str) -> Optional[str]:
         line = line.rstrip("\r")
         if not line:
-            yield from flush_buffer()
-            continue
+            return self.flush()
         if line.startswith("data:"):
-            buffer.append(line[len("data:") :].strip())
-        elif line.startswith(":"):
-            continue
-        else:
-            buffer.append(line.strip())
+            self._lines.append(line[len("data:") :].strip())
+        elif not line.startswith(":"):
+            self._lines.append(line.strip())
+        return None
 
-    yield from flush_buffer()
+    def flush(self) -> Optional[str]:
+        data_str = "\n".join(self._lines).strip()
+        self._lines.clear()
+        return data_str or None
+
+
+def _gemini_stream_event_texts(
+    data_str: str,
+    url: str,
+    status_code: int,
+    usage_out: Optional[Dict[str, Any]],
+) -> list[str]:
+    try:
+        obj = json.loads(data_str)
+    except json.JSONDecodeError:
+        logger.debug("Gemini doc stream non-JSON event preview=%.200s", data_str)
+        return []
+    log_gemini_response(
+        logger,
+        "gemini_doc_stream_generate",
+        url=url,
+        status_code=status_code,
+        response=obj,
+    )
+    usage = extract_gemini_usage_metadata(obj)
+    if usage_out is not None and usage:
+        usage_out.update(usage)
+    texts: list[str] = []
+    for candidate in obj.get("candidates") or []:
+        for part in (candidate.get("content") or {}).get("parts") or []:
+            text = part.get("text")
+            if isinstance(text, str) and text:
+                texts.append(text)
+    return texts
 
 
 def extract_text_response(response_json: Dict[str, Any]) -> str:
@@ -437,6 +826,34 @@ def save_message_to_firestore(
         return False
 
 
+# Strong references to in-flight background saves; the event loop only keeps weak ones.
+_BACKGROUND_SAVES: "set[asyncio.Task[bool]]" = set()
+
+
+def schedule_firestore_save(logger_obj: logging.Logger, label: str, **kwargs: Any) -> "asyncio.Task[bool]":
+    """
+    Run save_message_to_firestore in a worker thread without holding the response on it.
+    The outcome is logged against `label` once the write finishes.
+    """
+    chat_id = kwargs.get("chat_id")
+    task = asyncio.create_task(asyncio.to_thread(save_message_to_firestore, **kwargs))
+    _BACKGROUND_SAVES.add(task)
+
+    def _on_done(done: "asyncio.Task[bool]") -> None:
+        _BACKGROUND_SAVES.discard(done)
+        if done.cancelled():
+            logger_obj.warning("%s Firestore save cancelled | chatId=%s", label, chat_id)
+        elif done.exception() is not None:
+            logger_obj.error("%s Firestore save crashed | chatId=%s", label, chat_id, exc_info=done.exception())
+        elif done.result():
+            logger_obj.info("%s Firestore save success | chatId=%s", label, chat_id)
+        else:
+            logger_obj.error("%s Firestore save failed | chatId=%s", label, chat_id)
+
+    task.add_done_callback(_on_done)
+    return task
+
+
 def localize_message(key: str, language: Optional[str]) -> str:
     lang = normalize_language(language)
     return get_pdf_error_message(key, lang)
@@ -448,37 +865,96 @@ async def stream_gemini_text(
     model: Optional[str] = None,
     system_instruction: Optional[str] = None,
     usage_out: Optional[Dict[str, Any]] = None,
+    cached_content: Optional[str] = None,
 ) -> AsyncGenerator[str, None]:
-    loop = asyncio.get_running_loop()
-    queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+    """
+    streamGenerateContent on the shared HTTP/2 client: chunks are read on the event loop as they
+    arrive, with no worker thread or queue in between, and request failures propagate to the caller
+    instead of ending the stream early.
+    """
+    url, payload, effective_model = _gemini_stream_request(parts, api_key, model, system_instruction, cached_content)
+    est_tokens = _estimate_request_tokens(parts)
+    limiter = await _acquire_gemini_quota(api_key, est_tokens)
+    usage: Dict[str, Any] = usage_out if usage_out is not None else {}
+    client = get_async_http_client()
+    async with client.stream(
+        "POST",
+        url,
+        json=payload,
+        timeout=180,
+        headers={"Accept": "text/event-stream"},
+    ) as resp:
+        logger.info(
+            "Gemini doc stream request started status=%s model=%s",
+            resp.status_code,
+            effective_model,
+        )
+        if not resp.is_success:
+            body = await resp.aread()
+            exc = _gemini_stream_failed(resp.status_code, body.decode("utf-8", errors="ignore"), resp.headers)
+            _penalize_on_quota(limiter, exc)
+            raise exc
 
-    effective_model = _effective_pdf_model(model)
+        events = _SSEEventBuffer()
+        async for line in resp.aiter_lines():
+            data_str = events.feed(line)
+            if data_str:
+                for text in _gemini_stream_event_texts(data_str, url, resp.status_code, usage):
+                    yield text
+        data_str = events.flush()
+        if data_str:
+            for text in _gemini_stream_event_texts(data_str, url, resp.status_code, usage):
+                yield text
+    limiter.record_usage(est_tokens, usage.get("totalTokenCount"))
 
-    def producer():
-        try:
-            for chunk in call_gemini_generate_stream(
-                parts,
-                api_key,
-                effective_model,
-                system_instruction,
-                usage_out,
-            ):
-                if chunk:
-                    asyncio.run_coroutine_threadsafe(queue.put(chunk), loop)
-        except Exception as exc:  # pragma: no cover - defensive guard
-            logger.exception("Gemini doc stream producer error: %s", exc)
-        finally:
-            asyncio.run_coroutine_threadsafe(queue.put(None), loop)
 
-    producer_task = asyncio.create_task(asyncio.to_thread(producer))
-    try:
-        while True:
-            chunk = await queue.get()
-            if chunk is None:
-                break
-            yield chunk
-    finally:
-        await producer_task
+REPLAY_CHUNK_INTERVAL = 0.02
+REPLAY_MAX_SECONDS = 2.0
+_REPLAY_MIN_CHUNK_CHARS = 4
+_REPLAY_MIN_TEXT_CHARS = 50
+
+
+async def replay_text_as_stream(
+    *,
+    chat_id: str,
+    message_id: str,
+    tool: str,
+    text: str,
+    chunk_metadata: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Emit an already complete answer through the stream manager as paced deltas, so a client that
+    asked for streaming still renders progressively. Chunks grow with the text so playback never
+    takes longer than REPLAY_MAX_SECONDS; very short answers go out as the final chunk only.
+    """
+    if len(text) > _REPLAY_MIN_TEXT_CHARS:
+        steps = max(1, int(REPLAY_MAX_SECONDS / REPLAY_CHUNK_INTERVAL))
+        size = max(_REPLAY_MIN_CHUNK_CHARS, -(-len(text) // steps))
+        for start in range(0, len(text), size):
+            payload: Dict[str, Any] = {
+                "chatId": chat_id,
+                "messageId": message_id,
+                "tool": tool,
+                "delta": text[start:start + size],
+                "content": text[:start + size],
+                "isFinal": False,
+            }
+            if chunk_metadata:
+                payload["metadata"] = chunk_metadata
+            await stream_manager.emit_chunk(chat_id, payload)
+            await asyncio.sleep(REPLAY_CHUNK_INTERVAL)
+    await stream_manager.emit_chunk(
+        chat_id,
+        {
+            "chatId": chat_id,
+            "messageId": message_id,
+            "tool": tool,
+            "content": text,
+            "delta": None,
+            "isFinal": True,
+            "metadata": chunk_metadata or {},
+        },
+    )
 
 
 async def generate_text_with_optional_stream(
@@ -494,7 +970,15 @@ async def generate_text_with_optional_stream(
     tone_key: Optional[ToneKey] = None,
     tone_language: Optional[str] = None,
     usage_context: Optional[Dict[str, Any]] = None,
+    replay_on_stream_failure: bool = False,
+    cached_content: Optional[str] = None,
 ) -> Tuple[str, Optional[str]]:
+    """
+    Generate an answer, streaming deltas to `chat_id` when `stream` is set. With
+    `replay_on_stream_failure`, a stream that fails before its first chunk falls back to a
+    regular request whose answer is replayed to the client as paced chunks. `cached_content`
+    names a context cache already holding the document, which `parts` then leave out.
+    """
     effective_model = _effective_pdf_model(model)
     system_instruction = build_system_message(
         language=tone_language,
@@ -503,18 +987,18 @@ async def generate_text_with_optional_stream(
         include_followup=True,
         followup_language=followup_language or tone_language,
     )
-    usage_error: Optional[str] = None
+    usage_status = "success"
     usage_data: Dict[str, Any] = {}
     start_time = time.monotonic()
 
     if not stream or not chat_id:
         try:
-            response_json = await asyncio.to_thread(
-                call_gemini_generate,
+            response_json = await call_gemini_generate_async(
                 parts,
                 api_key,
                 effective_model,
                 system_instruction,
+                cached_content,
             )
             usage_data = extract_gemini_usage_metadata(response_json)
             candidates = response_json.get("candidates", [])
@@ -527,23 +1011,27 @@ async def generate_text_with_optional_stream(
                 )
             clean_text = _strip_markdown_stars(extract_text_response(response_json))
             return clean_text, None
-        except Exception as exc:
-            usage_error = str(exc)
+        except asyncio.CancelledError:
+            # e.g. a hedged attempt that lost the race; neither a success nor a failure.
+            usage_status = "cancelled"
+            raise
+        except Exception:
+            usage_status = "error"
             raise
         finally:
             _finalize_usage_event(
                 usage_context,
                 usage_data,
                 int((time.monotonic() - start_time) * 1000),
-                status="error" if usage_error else "success",
-                error_code="gemini_generate_failed" if usage_error else None,
+                status=usage_status,
+                error_code=_USAGE_ERROR_CODES.get(usage_status, {}).get("generate"),
             )
 
     # Use dedicated uuid4 import to avoid accidental shadowing
     message_id = f"{tool}_{_uuid4().hex}"
     accumulated: list[str] = []
     usage_out: Dict[str, Any] = {}
-    stream_error = False
+    replay_error: Optional[Exception] = None
     try:
         async for chunk in stream_gemini_text(
             parts,
@@ -551,6 +1039,7 @@ async def generate_text_with_optional_stream(
             effective_model,
             system_instruction=system_instruction,
             usage_out=usage_out,
+            cached_content=cached_content,
         ):
             clean_chunk = _strip_markdown_stars(chunk)
             accumulated.append(clean_chunk)
@@ -565,28 +1054,60 @@ async def generate_text_with_optional_stream(
             if chunk_metadata:
                 payload["metadata"] = chunk_metadata
             await stream_manager.emit_chunk(chat_id, payload)
-    except Exception as exc:
-        stream_error = True
-        usage_error = str(exc)
-        await stream_manager.emit_chunk(
-            chat_id,
-            {
-                "chatId": chat_id,
-                "messageId": message_id,
-                "tool": tool,
-                "isFinal": True,
-                "error": "stream_failed",
-            },
-        )
+    except asyncio.CancelledError:
+        usage_status = "cancelled"
         raise
+    except Exception as exc:
+        usage_status = "error"
+        if replay_on_stream_failure and not accumulated:
+            replay_error = exc
+        else:
+            await _emit_stream_failed(chat_id, message_id, tool)
+            raise
     finally:
-        _finalize_usage_event(
-            usage_context,
-            usage_out,
-            int((time.monotonic() - start_time) * 1000),
-            status="error" if stream_error else "success",
-            error_code="gemini_stream_failed" if stream_error else None,
+        # A replayed request reports its own outcome; recording the failed stream too would
+        # count one request twice.
+        if replay_error is None:
+            _finalize_usage_event(
+                usage_context,
+                usage_out,
+                int((time.monotonic() - start_time) * 1000),
+                status=usage_status,
+                error_code=_USAGE_ERROR_CODES.get(usage_status, {}).get("stream"),
+            )
+
+    if replay_error is not None:
+        logger.warning(
+            "Gemini stream failed before the first chunk; replaying a regular answer",
+            extra={"chatId": chat_id, "tool": tool, "error": str(replay_error)},
         )
+        try:
+            text, _ = await generate_text_with_optional_stream(
+                parts=parts,
+                api_key=api_key,
+                stream=False,
+                chat_id=chat_id,
+                tool=tool,
+                model=model,
+                chunk_metadata=chunk_metadata,
+                followup_language=followup_language,
+                tone_key=tone_key,
+                tone_language=tone_language,
+                usage_context=usage_context,
+                cached_content=cached_content,
+            )
+            await replay_text_as_stream(
+                chat_id=chat_id,
+                message_id=message_id,
+                tool=tool,
+                text=text,
+                chunk_metadata=chunk_metadata,
+            )
+        except Exception:
+            # The client is still waiting on this message id; close it before giving up.
+            await _emit_stream_failed(chat_id, message_id, tool)
+            raise
+        return text, message_id
 
     final_text = "".join(accumulated).strip()
     await stream_manager.emit_chunk(
@@ -604,6 +1125,25 @@ async def generate_text_with_optional_stream(
     return final_text, message_id
 
 
+_USAGE_ERROR_CODES: Dict[str, Dict[str, str]] = {
+    "error": {"generate": "gemini_generate_failed", "stream": "gemini_stream_failed"},
+    "cancelled": {"generate": "gemini_generate_cancelled", "stream": "gemini_stream_cancelled"},
+}
+
+
+async def _emit_stream_failed(chat_id: str, message_id: str, tool: str) -> None:
+    await stream_manager.emit_chunk(
+        chat_id,
+        {
+            "chatId": chat_id,
+            "messageId": message_id,
+            "tool": tool,
+            "isFinal": True,
+            "error": "stream_failed",
+        },
+    )
+
+
 def _finalize_usage_event(
     usage_context: Optional[Dict[str, Any]],
     usage_data: Dict[str, Any],
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import re
+import zipfile
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+from core.convert_pool import convert_file_async
+from core.gemini_config import get_gemini_config
+from core.gemini_file_cache import file_cache_key_for_path, get_or_upload
+from core.language_support import normalize_language
+from errors_response import get_pdf_error_message
+from endpoints.files_pdf.utils import (
+    extract_user_id,
+    build_usage_context,
+    async_download_file_to_path,
+    scratch_tempdir,
+    gemini_file_is_active,
+    upload_file_to_gemini_async,
+    with_gemini_connection_warm,
+    generate_text_with_optional_stream,
+    schedule_firestore_save,
+    log_full_payload,
+    attach_streaming_payload,
+    build_pdf_parts,
+)
+
+PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+# Stored lower-case: validate_pptx_mime compares against the lower-cased header value.
+PPTX_MIME_ALLOWED = frozenset(
+    {
+        PPTX_MIME_FALLBACK,
+        "application/vnd.ms-powerpoint",
+        "application/vnd.ms-powerpoint.presentation.macroenabled.12",
+    }
+)
+# Trie-shaped alternation: one left-to-right pass that only branches after a leading "p".
+_PPTX_HINT_RE = re.compile(r"p(?:resentation|owerpoint|pt)")
+
+
+@lru_cache(maxsize=128)
+def _normalize_pptx_mime(mime: str) -> Optional[str]:
+    # Servers send a handful of distinct Content-Type values, so each is classified once.
+    head = mime.split(";", 1)[0].strip().lower()
+    if head in PPTX_MIME_ALLOWED or _PPTX_HINT_RE.search(head):
+        return head
+    return None
+
+
+def validate_pptx_mime(mime: str) -> str:
+    """Return the normalised (lower-case, parameter-free) mime, or raise 400 for non-presentation types."""
+    if not mime:
+        return PPTX_MIME_FALLBACK
+    head = _normalize_pptx_mime(mime)
+    if head is not None:
+        return head
+    raise HTTPException(
+        status_code=400,
+        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
+    )
+
+
+@lru_cache(maxsize=1)
+def pptx_limits() -> Tuple[int, int]:
+    """
+    (max slides, max uncompressed media bytes) per deck; decks past these tend to wedge soffice for
+    minutes, so they are refused before conversion. Read on first use, after main.py has loaded .env.
+    """
+    return int(os.getenv("PPTX_MAX_SLIDES", "200")), int(os.getenv("PPTX_MAX_MEDIA_MB", "100")) * 1024 * 1024
+
+
+def _pptx_over_limits(path: Path) -> bool:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            slides = media_bytes = 0
+            for info in archive.infolist():
+                name = info.filename
+                if name.startswith("ppt/slides/slide") and name.endswith(".xml"):
+                    slides += 1
+                elif name.startswith("ppt/media/"):
+                    media_bytes += info.file_size
+    except zipfile.BadZipFile:
+        # Legacy .ppt and other non-OOXML inputs have no central directory to inspect.
+        return False
+    max_slides, max_media_bytes = pptx_limits()
+    return slides > max_slides or media_bytes > max_media_bytes
+
+
+async def ensure_pptx_convertible(path: Path) -> None:
+    """Raise 413 for decks with too many slides or too much embedded media to convert reliably."""
+    if await asyncio.to_thread(_pptx_over_limits, path):
+        raise HTTPException(
+            status_code=413,
+            detail={"success": False, "error": "file_too_large", "message": get_pdf_error_message("file_too_large", None)},
+        )
+
+
+@lru_cache(maxsize=256)
+def default_pptx_prompt(template: str, language: str) -> str:
+    """`template` with {language} filled in; default prompts only vary by language, so each is built once."""
+    return template.format(language=language)
+
+
+# Longer "extensions" come from dots inside the base name ("Q3.final review"), not real suffixes.
+_MAX_SUFFIX_LEN = 6
+
+
+def pptx_suffix(file_name: Optional[str]) -> str:
+    if file_name and "." in file_name:
+        suffix = "." + file_name.rsplit(".", 1)[-1]
+        if len(suffix) <= _MAX_SUFFIX_LEN:
+            return suffix
+    return ".pptx"
+
+
+async def pptx_url_to_file_uri(
+    file_url: str,
+    file_name: Optional[str],
+    api_key: str,
+    *,
+    max_mb: int = 30,
+    display_name: Optional[str] = None,
+) -> Tuple[str, int, str]:
+    """
+    Download a deck into a scratch dir, convert it there unless it already is a PDF, and upload the
+    PDF from disk; the file content never sits in Python memory. Uploads are cached by the downloaded
+    content, so a repeated deck skips both conversion and upload. Returns (file_uri, size, mime).
+    """
+    # Room for the download and the PDF converted from it.
+    with scratch_tempdir("pptx_", reserve_mb=2 * max_mb) as tmpdir:
+        workdir = Path(tmpdir)
+        src = workdir / f"input{pptx_suffix(file_name)}"
+        size, mime = await async_download_file_to_path(file_url, src, max_mb=max_mb, require_pdf=False)
+        mime = validate_pptx_mime(mime)
+
+        async def _convert_and_upload() -> str:
+            if mime.startswith("application/pdf"):
+                return await upload_file_to_gemini_async(
+                    src, "application/pdf", display_name or file_name or "slides.pdf", api_key
+                )
+            await ensure_pptx_convertible(src)
+            pdf_path = await with_gemini_connection_warm(convert_file_async(src, workdir))
+            return await upload_file_to_gemini_async(pdf_path, "application/pdf", display_name or pdf_path.name, api_key)
+
+        file_uri = await get_or_upload(
+            await file_cache_key_for_path(src, api_key),
+            _convert_and_upload,
+            partial(gemini_file_is_active, api_key=api_key),
+        )
+        return file_uri, size, mime
+
+
+async def run_pptx_tool(
+    *,
+    tool: str,
+    payload: Any,
+    request: Request,
+    logger: logging.Logger,
+    default_prompt: str,
+    result_key: str,
+    prompt_suffix: Optional[str] = None,
+    extra_text: Optional[str] = None,
+    extra_metadata: Optional[Dict[str, Any]] = None,
+    save_metadata: Optional[Dict[str, Any]] = None,
+    empty_error_key: Optional[str] = None,
+    replay_on_stream_failure: bool = False,
+    max_mb: int = 30,
+) -> Dict[str, Any]:
+    """
+    Shared single-file PPTX flow: download -> validate -> convert -> upload -> Gemini -> persist.
+    `default_prompt` may reference {language}; `prompt_suffix` is appended to whichever prompt is
+    used and `extra_text` becomes a text part after it. `extra_metadata` goes with every streamed
+    chunk, `save_metadata` with the Firestore message. When `empty_error_key` is set an empty model
+    answer becomes a 404 with that error key. Failures propagate; endpoints wrap this in
+    file_error_handler.
+    """
+    label = tool.split("_", 1)[1]
+    user_id = extract_user_id(request)
+    language = normalize_language(payload.language) or "English"
+    extra_metadata = extra_metadata or {}
+    log_full_payload(logger, tool, payload)
+    logger.info(
+        f"PPTX {label} request",
+        extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
+    )
+
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
+
+    prompt = payload.prompt.strip() if payload.prompt else None
+    prompt = prompt or default_pptx_prompt(default_prompt, language)
+    if prompt_suffix:
+        prompt += prompt_suffix
+    logger.debug(
+        f"PPTX {label} prompt | chatId=%s userId=%s lang=%s prompt=%s extra=%s",
+        payload.chat_id,
+        user_id,
+        language,
+        prompt,
+        extra_metadata,
+    )
+    logger.info(f"PPTX {label} download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+    file_uri, size, mime = await pptx_url_to_file_uri(payload.file_url, payload.file_name, gemini_key, max_mb=max_mb)
+    logger.info(
+        f"PPTX {label} upload ok",
+        extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+    )
+    parts = build_pdf_parts((file_uri,), prompt, extra_text)
+    usage_context = build_usage_context(
+        request=request,
+        user_id=user_id,
+        endpoint=f"{label}_pptx",
+        model=effective_model,
+        payload=payload,
+    )
+    text, stream_message_id = await generate_text_with_optional_stream(
+        parts=parts,
+        api_key=gemini_key,
+        stream=bool(payload.stream),
+        chat_id=payload.chat_id,
+        tool=tool,
+        model=effective_model,
+        chunk_metadata={
+            "language": language,
+            **extra_metadata,
+        },
+        tone_key=payload.tone_key,
+        tone_language=language,
+        followup_language=language,
+        usage_context=usage_context,
+        replay_on_stream_failure=replay_on_stream_failure,
+    )
+    if not text:
+        if empty_error_key:
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "success": False,
+                    "error": empty_error_key,
+                    "message": get_pdf_error_message(empty_error_key, language),
+                },
+            )
+        raise RuntimeError("Empty response from Gemini")
+    logger.info(
+        f"PPTX {label} gemini response | chatId=%s preview=%.500s",
+        payload.chat_id,
+        text,
+    )
+
+    extra_fields = {
+        "success": True,
+        "chatId": payload.chat_id,
+        result_key: text,
+        "language": language,
+        "model": effective_model,
+    }
+    result = attach_streaming_payload(
+        extra_fields,
+        tool=tool,
+        content=text,
+        streaming=bool(stream_message_id),
+        message_id=stream_message_id,
+        extra_data={
+            result_key: text,
+            "language": language,
+            "model": effective_model,
+        },
+    )
+    schedule_firestore_save(
+        logger,
+        f"PPTX {label}",
+        user_id=user_id,
+        chat_id=payload.chat_id,
+        content=text,
+        metadata={
+            "tool": tool,
+            "fileUrl": payload.file_url,
+            "fileName": payload.file_name,
+            **(save_metadata or {}),
+        },
+        stream_message_id=stream_message_id,
+    )
+    return result
@@ -1,49 +1,26 @@
 import logging
-import os
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import PptxAnalyzeRequest
+from endpoints.files_pptx._common import pptx_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.analyze")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
-
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
-
-
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
 
 
 @router.post("/analyze")
@@ -57,52 +34,9 @@ async def analyze_pptx(payload: PptxAnalyzeRequest, request: Request) -> Dict[st
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
 
-    logger.info("PPTX analyze download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
-    try:
-        content, mime = download_file(payload.file_url, max_mb=50, require_pdf=False)
-        mime = _validate_pptx_mime(mime)
-    except HTTPException as he:
-        return build_success_error_response(
-            tool="pptx_analyze",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=he.status_code,
-            detail=he.detail,
-        )
-    except Exception as exc:
-        return build_success_error_response(
-            tool="pptx_analyze",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
-    logger.info("PPTX analyze download ok", extra={"chatId": payload.chat_id, "size": len(content), "mime": mime})
-
-    is_pdf = mime.lower().startswith("application/pdf")
-    if is_pdf:
-        pdf_bytes = content
-        pdf_filename = payload.file_name or "slides.pdf"
-    else:
-        suffix = ".pptx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
-        try:
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        except Exception as exc:
-            return build_success_error_response(
-                tool="pptx_analyze",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
 
     prompt = (payload.prompt or "").strip() or f"Analyze this presentation in {language} and return your insights."
     logger.debug(
@@ -113,9 +47,15 @@ async def analyze_pptx(payload: PptxAnalyzeRequest, request: Request) -> Dict[st
         prompt,
     )
     try:
-        logger.info("PPTX analyze upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, gemini_key)
-        logger.info("PPTX analyze upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+        logger.info("PPTX analyze download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+        # Downloaded, converted and uploaded from disk; a repeated deck reuses its earlier upload.
+        file_uri, size, mime = await pptx_url_to_file_uri(
+            payload.file_url, payload.file_name, gemini_key, max_mb=50, display_name=payload.file_name or "slides.pdf"
+        )
+        logger.info(
+            "PPTX analyze upload ok",
+            extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+        )
         usage_context = build_usage_context(
             request=request,
             user_id=user_id,
@@ -143,9 +83,9 @@ async def analyze_pptx(payload: PptxAnalyzeRequest, request: Request) -> Dict[st
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "PPTX analyze gemini response | chatId=%s preview=%s",
+            "PPTX analyze gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         base_payload = {
@@ -168,7 +108,9 @@ async def analyze_pptx(payload: PptxAnalyzeRequest, request: Request) -> Dict[st
             },
         )
 
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "PPTX analyze",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=text,
@@ -179,10 +121,6 @@ async def analyze_pptx(payload: PptxAnalyzeRequest, request: Request) -> Dict[st
             },
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("PPTX analyze Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX analyze Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("PPTX analyze HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
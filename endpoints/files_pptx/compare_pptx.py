@@ -1,62 +1,50 @@
+import asyncio
 import logging
-import os
+from pathlib import Path
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
+from core.convert_pool import convert_file_async
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import PptxCompareRequest
+from endpoints.files_pptx._common import default_pptx_prompt, ensure_pptx_convertible, pptx_suffix, validate_pptx_mime
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
+    async_download_file_to_path,
+    scratch_tempdir,
+    upload_file_to_gemini_async,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
+    build_pdf_parts,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.compare")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
-
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
-
-
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
 
 
-def _download_and_convert(file_url: str, file_name: str | None, max_mb: int) -> tuple[bytes, str]:
-    content, mime = download_file(file_url, max_mb=max_mb, require_pdf=False)
-    mime = _validate_pptx_mime(mime)
-    is_pdf = mime.lower().startswith("application/pdf")
+async def _download_and_convert(file_url: str, file_name: str | None, max_mb: int, workdir: Path) -> tuple[Path, str]:
+    """Download into `workdir` and convert there; only paths are handed around, never the file bytes."""
+    workdir.mkdir(parents=True, exist_ok=True)
+    src = workdir / f"input{pptx_suffix(file_name)}"
+    _, mime = await async_download_file_to_path(file_url, src, max_mb=max_mb, require_pdf=False)
+    mime = validate_pptx_mime(mime)
+    is_pdf = mime.startswith("application/pdf")
     if is_pdf:
-        return content, file_name or "slides.pdf"
-    suffix = ".pptx"
-    if file_name and "." in file_name:
-        suffix = "." + file_name.split(".")[-1]
-    pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-    return pdf_bytes, pdf_filename or file_name or "slides.pdf"
+        return src, file_name or "slides.pdf"
+    await ensure_pptx_convertible(src)
+    pdf_path = await convert_file_async(src, workdir)
+    return pdf_path, pdf_path.name or file_name or "slides.pdf"
+
+
+_DEFAULT_PROMPT = "Compare these two presentations in {language} and list the differences."
 
 
 @router.post("/compare")
@@ -71,46 +59,53 @@ async def compare_pptx(payload: PptxCompareRequest, request: Request) -> Dict[st
     )
 
     try:
-        logger.info("PPTX compare download start file1", extra={"chatId": payload.chat_id, "fileUrl": payload.file1})
-        try:
-            pdf1_bytes, pdf1_name = _download_and_convert(payload.file1, payload.file_name, max_mb=30)
-            logger.info("PPTX compare download start file2", extra={"chatId": payload.chat_id, "fileUrl": payload.file2})
-            pdf2_bytes, pdf2_name = _download_and_convert(payload.file2, payload.file_name, max_mb=30)
-        except HTTPException as he:
-            return build_success_error_response(
-                tool="pptx_compare",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=he.status_code,
-                detail=he.detail,
+        config = get_gemini_config()
+        gemini_key = config.api_key
+        effective_model = payload.model or config.pdf_model
+
+        # Sources and converted PDFs live only on disk; the directory goes away once both are uploaded.
+        # It reserves room for two decks of up to 30 MB, each with its converted PDF.
+        with scratch_tempdir("pptx_compare_", reserve_mb=2 * 2 * 30) as tmpdir:
+            logger.info("PPTX compare download start file1", extra={"chatId": payload.chat_id, "fileUrl": payload.file1})
+            try:
+                pdf1_path, pdf1_name = await _download_and_convert(
+                    payload.file1, payload.file_name, max_mb=30, workdir=Path(tmpdir) / "file1"
+                )
+                logger.info("PPTX compare download start file2", extra={"chatId": payload.chat_id, "fileUrl": payload.file2})
+                pdf2_path, pdf2_name = await _download_and_convert(
+                    payload.file2, payload.file_name, max_mb=30, workdir=Path(tmpdir) / "file2"
+                )
+            except HTTPException as he:
+                return build_success_error_response(
+                    tool="pptx_compare",
+                    language=language,
+                    chat_id=payload.chat_id,
+                    user_id=user_id,
+                    status_code=he.status_code,
+                    detail=he.detail,
+                )
+            except Exception as exc:
+                return build_success_error_response(
+                    tool="pptx_compare",
+                    language=language,
+                    chat_id=payload.chat_id,
+                    user_id=user_id,
+                    status_code=500,
+                    detail=str(exc),
+                )
+
+            file_uri_1, file_uri_2 = await asyncio.gather(
+                upload_file_to_gemini_async(pdf1_path, "application/pdf", pdf1_name, gemini_key),
+                upload_file_to_gemini_async(pdf2_path, "application/pdf", pdf2_name, gemini_key),
             )
-        except Exception as exc:
-            return build_success_error_response(
-                tool="pptx_compare",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
-
-        file_uri_1 = upload_to_gemini_files(pdf1_bytes, "application/pdf", pdf1_name, gemini_key)
-        file_uri_2 = upload_to_gemini_files(pdf2_bytes, "application/pdf", pdf2_name, gemini_key)
         logger.info(
             "PPTX compare upload ok",
             extra={"chatId": payload.chat_id, "fileUri1": file_uri_1, "fileUri2": file_uri_2},
         )
 
-        prompt = (payload.prompt or "").strip() or f"Compare these two presentations in {language} and list the differences."
-        parts = [
-            {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri_1}},
-            {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri_2}},
-            {"text": prompt},
-        ]
+        prompt = payload.prompt.strip() if payload.prompt else None
+        prompt = prompt or default_pptx_prompt(_DEFAULT_PROMPT, language)
+        parts = build_pdf_parts((file_uri_1, file_uri_2), prompt)
         usage_context = build_usage_context(
             request=request,
             user_id=user_id,
@@ -134,9 +129,9 @@ async def compare_pptx(payload: PptxCompareRequest, request: Request) -> Dict[st
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "PPTX compare gemini response | chatId=%s preview=%s",
+            "PPTX compare gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         base_payload = {
@@ -159,7 +154,9 @@ async def compare_pptx(payload: PptxCompareRequest, request: Request) -> Dict[st
             },
         )
 
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "PPTX compare",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=text,
@@ -171,10 +168,6 @@ async def compare_pptx(payload: PptxCompareRequest, request: Request) -> Dict[st
             },
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("PPTX compare Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX compare Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("PPTX compare HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
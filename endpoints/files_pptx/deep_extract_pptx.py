@@ -1,49 +1,26 @@
 import logging
-import os
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import PptxDeepExtractRequest
+from endpoints.files_pptx._common import pptx_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.deep_extract")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
-
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
-
-
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
 
 
 @router.post("/deep_extract")
@@ -57,52 +34,9 @@ async def deep_extract_pptx(payload: PptxDeepExtractRequest, request: Request) -
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
 
-    logger.info("PPTX deep_extract download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
-    try:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_pptx_mime(mime)
-    except HTTPException as he:
-        return build_success_error_response(
-            tool="pptx_deep_extract",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=he.status_code,
-            detail=he.detail,
-        )
-    except Exception as exc:
-        return build_success_error_response(
-            tool="pptx_deep_extract",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
-    logger.info("PPTX deep_extract download ok", extra={"chatId": payload.chat_id, "size": len(content), "mime": mime})
-
-    is_pdf = mime.lower().startswith("application/pdf")
-    if is_pdf:
-        pdf_bytes = content
-        pdf_filename = payload.file_name or "slides.pdf"
-    else:
-        suffix = ".pptx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
-        try:
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        except Exception as exc:
-            return build_success_error_response(
-                tool="pptx_deep_extract",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
 
     prompt_text = (payload.prompt or "").strip() or f"Extract the specified fields from this presentation in {language}."
     logger.debug(
@@ -114,9 +48,15 @@ async def deep_extract_pptx(payload: PptxDeepExtractRequest, request: Request) -
         prompt_text,
     )
     try:
-        logger.info("PPTX deep_extract upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, gemini_key)
-        logger.info("PPTX deep_extract upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+        logger.info("PPTX deep_extract download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+        # Downloaded, converted and uploaded from disk; a repeated deck reuses its earlier upload.
+        file_uri, size, mime = await pptx_url_to_file_uri(
+            payload.file_url, payload.file_name, gemini_key, display_name=payload.file_name or "slides.pdf"
+        )
+        logger.info(
+            "PPTX deep_extract upload ok",
+            extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+        )
         fields_text = ""
         if payload.fields:
             fields_text = f"Fields to extract: {', '.join(payload.fields)}"
@@ -151,9 +91,9 @@ async def deep_extract_pptx(payload: PptxDeepExtractRequest, request: Request) -
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "PPTX deep_extract gemini response | chatId=%s preview=%s",
+            "PPTX deep_extract gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         extra_fields = {
@@ -177,7 +117,9 @@ async def deep_extract_pptx(payload: PptxDeepExtractRequest, request: Request) -
                 "fields": payload.fields,
             },
         )
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "PPTX deep_extract",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=text,
@@ -189,10 +131,6 @@ async def deep_extract_pptx(payload: PptxDeepExtractRequest, request: Request) -
             },
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("PPTX deep_extract Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX deep_extract Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("PPTX deep_extract HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
@@ -1,71 +1,112 @@
+import asyncio
 import logging
-import os
+from functools import partial
+from pathlib import Path
 from typing import Any, Dict
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
-from endpoints.helper_fail_response import build_success_error_response
+from core.convert_pool import convert_batch_async
+from core.gemini_file_cache import cached_active_file_uri, file_cache_key_for_path, get_or_upload
+from endpoints.helper_error_handler import file_error_handler
 from schemas import PptxMultiAnalyzeRequest
+from endpoints.files_pptx._common import (
+    default_pptx_prompt,
+    ensure_pptx_convertible,
+    pptx_suffix,
+    validate_pptx_mime,
+)
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
+    async_download_file_to_path,
+    scratch_tempdir,
+    gemini_file_is_active,
+    upload_file_to_gemini_async,
+    with_gemini_connection_warm,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
+    build_pdf_parts,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.multi_analyze")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
-
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
-
-
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
+
+
+_URL_CONCURRENCY = 8
+
 
+async def _convert_urls_to_file_uris(file_urls: list[str], file_name: str | None, max_mb: int, api_key: str) -> list[str]:
+    semaphore = asyncio.Semaphore(_URL_CONCURRENCY)
 
-def _convert_urls_to_file_uris(file_urls: list[str], file_name: str | None, max_mb: int, api_key: str) -> list[str]:
-    uris: list[str] = []
-    for url in file_urls:
-        content, mime = download_file(url, max_mb=max_mb, require_pdf=False)
-        mime = _validate_pptx_mime(mime)
-        is_pdf = mime.lower().startswith("application/pdf")
-        if is_pdf:
-            pdf_bytes = content
-            pdf_filename = file_name or "slides.pdf"
-        else:
-            suffix = ".pptx"
-            if file_name and "." in file_name:
-                suffix = "." + file_name.split(".")[-1]
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, api_key)
-        uris.append(uri)
-    return uris
+    async def _bounded(coro):
+        async with semaphore:
+            return await coro
+
+    # Downloads, converted PDFs and uploads all work on files in one scratch dir; no deck is held in memory.
+    with scratch_tempdir("pptx_multi_", reserve_mb=2 * max_mb * len(file_urls)) as tmpdir:
+        workdir = Path(tmpdir)
+        suffix = pptx_suffix(file_name)
+
+        async def _download_one(idx: int, url: str) -> tuple[Path, str, str]:
+            src = workdir / f"input_{idx}{suffix}"
+            _, mime = await async_download_file_to_path(url, src, max_mb=max_mb, require_pdf=False)
+            return src, validate_pptx_mime(mime), await file_cache_key_for_path(src, api_key)
+
+        downloads = await asyncio.gather(*(_bounded(_download_one(idx, url)) for idx, url in enumerate(file_urls)))
+        is_active = partial(gemini_file_is_active, api_key=api_key)
+        file_uris: list[str | None] = list(
+            await asyncio.gather(*(cached_active_file_uri(key, is_active) for _, _, key in downloads))
+        )
+
+        # (path, display name) per input still to upload.
+        sources: dict[int, tuple[Path, str]] = {}
+        to_convert: list[int] = []
+        for idx, (src, mime, _) in enumerate(downloads):
+            if file_uris[idx]:
+                continue
+            if mime.startswith("application/pdf"):
+                sources[idx] = (src, file_name or "slides.pdf")
+            else:
+                sources[idx] = (src, src.name)
+                to_convert.append(idx)
+
+        # Every uncached non-PDF goes through a single LibreOffice run; results are slotted back by index.
+        if to_convert:
+            await asyncio.gather(*(ensure_pptx_convertible(sources[idx][0]) for idx in to_convert))
+            pdf_paths = await with_gemini_connection_warm(
+                convert_batch_async([sources[idx][0] for idx in to_convert], workdir)
+            )
+            for idx, pdf_path in zip(to_convert, pdf_paths):
+                sources[idx] = (pdf_path, pdf_path.name)
+
+        async def _upload_one(idx: int) -> None:
+            path, name = sources[idx]
+            file_uris[idx] = await _bounded(
+                get_or_upload(
+                    downloads[idx][2],
+                    lambda: upload_file_to_gemini_async(path, "application/pdf", name, api_key),
+                    is_active,
+                )
+            )
+
+        await asyncio.gather(*(_upload_one(idx) for idx in sources))
+
+    # Results are slotted by index, so parts still follow the order of file_urls.
+    return [uri for uri in file_uris if uri]
+
+
+_DEFAULT_PROMPT = "Analyze these presentations together in {language} and summarize key insights."
 
 
 @router.post("/multi_analyze")
+@file_error_handler(tool="pptx_multi_analyze", logger=logger)
 async def multi_analyze_pptx(payload: PptxMultiAnalyzeRequest, request: Request) -> Dict[str, Any]:
     user_id = extract_user_id(request)
     raw_language = payload.language
@@ -76,117 +117,75 @@ async def multi_analyze_pptx(payload: PptxMultiAnalyzeRequest, request: Request)
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileCount": len(payload.file_urls)},
     )
 
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
-
-    try:
-        logger.info("PPTX multi_analyze converting/uploading files", extra={"chatId": payload.chat_id})
-        try:
-            file_uris = _convert_urls_to_file_uris(payload.file_urls, payload.file_name, max_mb=50, api_key=gemini_key)
-        except HTTPException as he:
-            return build_success_error_response(
-                tool="pptx_multi_analyze",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=he.status_code,
-                detail=he.detail,
-            )
-        except Exception as exc:
-            return build_success_error_response(
-                tool="pptx_multi_analyze",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-        logger.info("PPTX multi_analyze file URIs ready", extra={"chatId": payload.chat_id, "count": len(file_uris)})
-
-        prompt = (payload.prompt or "").strip() or f"Analyze these presentations together in {language} and summarize key insights."
-        parts = [{"file_data": {"mime_type": "application/pdf", "file_uri": uri}} for uri in file_uris]
-        parts.append({"text": prompt})
-
-        usage_context = build_usage_context(
-            request=request,
-            user_id=user_id,
-            endpoint="multi_analyze_pptx",
-            model=effective_model,
-            payload=payload,
-        )
-        text, stream_message_id = await generate_text_with_optional_stream(
-            parts=parts,
-            api_key=gemini_key,
-            stream=bool(payload.stream),
-            chat_id=payload.chat_id,
-            tool="pptx_multi_analyze",
-            model=effective_model,
-            chunk_metadata={"language": language},
-            tone_key=payload.tone_key,
-            tone_language=language,
-            followup_language=language,
-            usage_context=usage_context,
-        )
-        if not text:
-            raise RuntimeError("Empty response from Gemini")
-        logger.info(
-            "PPTX multi_analyze gemini response | chatId=%s preview=%s",
-            payload.chat_id,
-            text[:500],
-        )
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
+
+    logger.info("PPTX multi_analyze converting/uploading files", extra={"chatId": payload.chat_id})
+    file_uris = await _convert_urls_to_file_uris(payload.file_urls, payload.file_name, max_mb=50, api_key=gemini_key)
+    logger.info("PPTX multi_analyze file URIs ready", extra={"chatId": payload.chat_id, "count": len(file_uris)})
 
-        extra_fields = {
-            "success": True,
-            "chatId": payload.chat_id,
+    prompt = (payload.prompt or "").strip() or default_pptx_prompt(_DEFAULT_PROMPT, language)
+    parts = build_pdf_parts(file_uris, prompt)
+
+    usage_context = build_usage_context(
+        request=request,
+        user_id=user_id,
+        endpoint="multi_analyze_pptx",
+        model=effective_model,
+        payload=payload,
+    )
+    text, stream_message_id = await generate_text_with_optional_stream(
+        parts=parts,
+        api_key=gemini_key,
+        stream=bool(payload.stream),
+        chat_id=payload.chat_id,
+        tool="pptx_multi_analyze",
+        model=effective_model,
+        chunk_metadata={"language": language},
+        tone_key=payload.tone_key,
+        tone_language=language,
+        followup_language=language,
+        usage_context=usage_context,
+    )
+    if not text:
+        raise RuntimeError("Empty response from Gemini")
+    logger.info(
+        "PPTX multi_analyze gemini response | chatId=%s preview=%.500s",
+        payload.chat_id,
+        text,
+    )
+
+    extra_fields = {
+        "success": True,
+        "chatId": payload.chat_id,
+        "analysis": text,
+        "language": language,
+        "model": effective_model,
+    }
+    result = attach_streaming_payload(
+        extra_fields,
+        tool="pptx_multi_analyze",
+        content=text,
+        streaming=bool(stream_message_id),
+        message_id=stream_message_id,
+        extra_data={
             "analysis": text,
             "language": language,
             "model": effective_model,
-        }
-        result = attach_streaming_payload(
-            extra_fields,
-            tool="pptx_multi_analyze",
-            content=text,
-            streaming=bool(stream_message_id),
-            message_id=stream_message_id,
-            extra_data={
-                "analysis": text,
-                "language": language,
-                "model": effective_model,
-            },
-        )
-        firestore_ok = save_message_to_firestore(
-            user_id=user_id,
-            chat_id=payload.chat_id,
-            content=text,
-            metadata={
-                "tool": "pptx_multi_analyze",
-                "fileUrls": payload.file_urls,
-                "fileName": payload.file_name,
-            },
-            stream_message_id=stream_message_id,
-        )
-        if firestore_ok:
-            logger.info("PPTX multi_analyze Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX multi_analyze Firestore save failed | chatId=%s", payload.chat_id)
-        return result
-    except HTTPException as hexc:
-        logger.error("PPTX multi_analyze HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
-        return build_success_error_response(
-            tool="pptx_multi_analyze",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=hexc.status_code,
-            detail=hexc.detail,
-        )
-    except Exception as exc:
-        logger.error("PPTX multi_analyze failed", exc_info=exc)
-        return build_success_error_response(
-            tool="pptx_multi_analyze",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
+        },
+    )
+    schedule_firestore_save(
+        logger,
+        "PPTX multi_analyze",
+        user_id=user_id,
+        chat_id=payload.chat_id,
+        content=text,
+        metadata={
+            "tool": "pptx_multi_analyze",
+            "fileUrls": payload.file_urls,
+            "fileName": payload.file_name,
+        },
+        stream_message_id=stream_message_id,
+    )
+    return result
@@ -1,63 +1,35 @@
 import logging
-import os
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
 from errors_response import get_pdf_error_message
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import PptxQnaRequest
+from endpoints.files_pptx._common import pptx_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.qna")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
 
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
 
-
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
-
-
-def _ensure_file_uri(payload: PptxQnaRequest, api_key: str) -> str:
+async def _ensure_file_uri(payload: PptxQnaRequest, api_key: str) -> str:
     if payload.file_id:
         return payload.file_id
     if payload.file_url:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_pptx_mime(mime)
-        suffix = ".pptx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
-        pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        display_name = pdf_filename or payload.file_name or "slides.pdf"
-        return upload_to_gemini_files(pdf_bytes, "application/pdf", display_name, api_key)
+        file_uri, _, _ = await pptx_url_to_file_uri(payload.file_url, payload.file_name, api_key)
+        return file_uri
     raise HTTPException(
         status_code=400,
         detail={"success": False, "error": "invalid_file_url", "message": get_pdf_error_message("invalid_file_url", payload.language)},
@@ -74,22 +46,24 @@ async def qna_pptx(payload: PptxQnaRequest, request: Request) -> Dict[str, Any]:
         "PPTX QnA request",
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
-    logger.debug(
-        "PPTX QnA question received",
-        extra={
-            "chatId": payload.chat_id,
-            "userId": user_id,
-            "language": language,
-            "question": (payload.question or "")[:500],
-        },
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "PPTX QnA question received",
+            extra={
+                "chatId": payload.chat_id,
+                "userId": user_id,
+                "language": language,
+                "question": (payload.question or "")[:500],
+            },
+        )
 
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
     try:
         logger.info("PPTX QnA ensure file", extra={"chatId": payload.chat_id, "fileId": payload.file_id, "fileUrl": payload.file_url})
         try:
-            file_uri = _ensure_file_uri(payload, gemini_key)
+            file_uri = await _ensure_file_uri(payload, gemini_key)
         except HTTPException as he:
             return build_success_error_response(
                 tool="pptx_qna",
@@ -146,9 +120,9 @@ async def qna_pptx(payload: PptxQnaRequest, request: Request) -> Dict[str, Any]:
                 detail={"success": False, "error": "no_answer_found", "message": msg},
             )
         logger.info(
-            "PPTX QnA gemini response | chatId=%s preview=%s",
+            "PPTX QnA gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            answer[:500],
+            answer,
         )
 
         extra_fields = {
@@ -170,7 +144,9 @@ async def qna_pptx(payload: PptxQnaRequest, request: Request) -> Dict[str, Any]:
                 "model": effective_model,
             },
         )
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "PPTX QnA",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=answer,
@@ -181,10 +157,6 @@ async def qna_pptx(payload: PptxQnaRequest, request: Request) -> Dict[str, Any]:
             },
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("PPTX QnA Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX QnA Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("PPTX QnA HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
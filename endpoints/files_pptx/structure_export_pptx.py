@@ -1,49 +1,26 @@
 import logging
-import os
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import PptxStructureExportRequest
+from endpoints.files_pptx._common import pptx_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.structure_export")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
-
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
-
-
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
 
 
 @router.post("/structure_export")
@@ -62,52 +39,9 @@ async def structure_export_pptx(payload: PptxStructureExportRequest, request: Re
         },
     )
 
-    logger.info("PPTX structure_export download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
-    try:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_pptx_mime(mime)
-    except HTTPException as he:
-        return build_success_error_response(
-            tool="pptx_structure_export",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=he.status_code,
-            detail=he.detail,
-        )
-    except Exception as exc:
-        return build_success_error_response(
-            tool="pptx_structure_export",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
-    logger.info("PPTX structure_export download ok", extra={"chatId": payload.chat_id, "size": len(content), "mime": mime})
-
-    is_pdf = mime.lower().startswith("application/pdf")
-    if is_pdf:
-        pdf_bytes = content
-        pdf_filename = payload.file_name or "slides.pdf"
-    else:
-        suffix = ".pptx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
-        try:
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        except Exception as exc:
-            return build_success_error_response(
-                tool="pptx_structure_export",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
 
     prompt_text = (payload.prompt or "").strip() or f"Export the structure of this presentation in {language}."
     logger.debug(
@@ -118,9 +52,15 @@ async def structure_export_pptx(payload: PptxStructureExportRequest, request: Re
         prompt_text,
     )
     try:
-        logger.info("PPTX structure_export upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, gemini_key)
-        logger.info("PPTX structure_export upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+        logger.info("PPTX structure_export download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+        # Downloaded, converted and uploaded from disk; a repeated deck reuses its earlier upload.
+        file_uri, size, mime = await pptx_url_to_file_uri(
+            payload.file_url, payload.file_name, gemini_key, display_name=payload.file_name or "slides.pdf"
+        )
+        logger.info(
+            "PPTX structure_export upload ok",
+            extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+        )
         parts = [
             {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}},
             {"text": prompt_text},
@@ -150,9 +90,9 @@ async def structure_export_pptx(payload: PptxStructureExportRequest, request: Re
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "PPTX structure_export gemini response | chatId=%s preview=%s",
+            "PPTX structure_export gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         extra_fields = {
@@ -174,7 +114,9 @@ async def structure_export_pptx(payload: PptxStructureExportRequest, request: Re
                 "model": effective_model,
             },
         )
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "PPTX structure_export",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=text,
@@ -185,10 +127,6 @@ async def structure_export_pptx(payload: PptxStructureExportRequest, request: Re
             },
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("PPTX structure_export Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX structure_export Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("PPTX structure_export HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
@@ -1,92 +1,132 @@
+import asyncio
 import logging
 import os
-import subprocess
-import tempfile
 import uuid
-from pathlib import Path
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from errors_response import get_pdf_error_message
-from endpoints.helper_fail_response import build_success_error_response
+from endpoints.helper_error_handler import file_error_handler
 from schemas import PptxSummaryRequest
+from endpoints.files_pptx._common import default_pptx_prompt, pptx_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
+    build_pdf_parts,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_pptx.summary")
 
-router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"])
+router = APIRouter(prefix="/api/v1/files/pptx", tags=["FilesPPTX"], default_response_class=ORJSONResponse)
 
 
-_PPTX_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-_PPTX_MIME_ALLOWED = {
-    _PPTX_MIME_FALLBACK,
-    "application/vnd.ms-powerpoint",
-    "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
-}
+_DEFAULT_PROMPT = "Summarize this presentation in {language} with key sections and bullets."
 
-def _validate_pptx_mime(mime: str) -> str:
-    if not mime:
-        return _PPTX_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _PPTX_MIME_ALLOWED:
-        return mime
-    if "presentation" in mime.lower() or "powerpoint" in mime.lower() or "ppt" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
+
+@lru_cache(maxsize=1)
+def _static_candidate_models() -> Tuple[str, ...]:
+    """Env-configured models first, then the built-in fallbacks; deduplicated, order kept."""
+    config = get_gemini_config()
+    return tuple(
+        dict.fromkeys(
+            filter(
+                None,
+                (
+                    config.pptx_model_env,
+                    config.pdf_model_env,
+                    "models/gemini-3-flash-preview",
+                    "models/gemini-2.5-pro",
+                    "models/gemini-2.0-flash-001",
+                ),
+            )
+        )
     )
 
 
-def _convert_to_pdf_via_libreoffice(content: bytes, suffix: str = ".pptx") -> bytes:
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_in = Path(tmpdir) / f"input{suffix}"
-        tmp_in.write_bytes(content)
-        cmd = [
-            "soffice",
-            "--headless",
-            "--convert-to",
-            "pdf",
-            "--outdir",
-            str(tmpdir),
-            str(tmp_in),
-        ]
-        logger.info("LibreOffice convert start", extra={"cmd": " ".join(cmd), "tmpdir": tmpdir, "suffix": suffix})
-        try:
-            result = subprocess.run(cmd, capture_output=True, timeout=60)
-        except Exception as exc:
-            logger.error("LibreOffice spawn failed", extra={"error": str(exc)})
-            raise RuntimeError(f"LibreOffice conversion failed: {exc}") from exc
-        stderr_preview = result.stderr.decode("utf-8", errors="ignore")[:400] if result.stderr else ""
-        stdout_preview = result.stdout.decode("utf-8", errors="ignore")[:200] if result.stdout else ""
+@lru_cache(maxsize=1)
+def _model_timeout() -> float:
+    # Upper bound for one non-streaming attempt that still has a fallback; a stalled model then hands
+    # over to the next candidate.
+    try:
+        return float(os.getenv("GEMINI_MODEL_TIMEOUT", "25"))
+    except ValueError:
+        return 25.0
+
+
+@lru_cache(maxsize=1)
+def _hedge_stagger() -> float:
+    # Read on first use, after main.py has loaded .env.
+    try:
+        return float(os.getenv("GEMINI_HEDGE_STAGGER", "6"))
+    except ValueError:
+        return 6.0
+
+
+async def _hedged_generate(
+    models: Sequence[str],
+    attempt: Callable[[str], Awaitable[Tuple[str, Optional[str]]]],
+    *,
+    stagger: Optional[float],
+    chat_id: Optional[str] = None,
+) -> Tuple[str, Optional[str], str]:
+    """
+    Run `attempt(model)` over `models` and return `(text, stream_message_id, model)` of the first success.
+    The next model starts when the running ones fail or after `stagger` seconds without an answer;
+    `stagger=None` disables hedging and tries the models strictly one after another.
+    """
+    remaining = iter(enumerate(models, start=1))
+    pending: Dict["asyncio.Task[Tuple[str, Optional[str]]]", str] = {}
+    last_error: Optional[Exception] = None
+
+    def launch() -> None:
+        nxt = next(remaining, None)
+        if nxt is None:
+            return
+        idx, model = nxt
         logger.info(
-            "LibreOffice convert finished",
-            extra={"rc": result.returncode, "stdout": stdout_preview, "stderr": stderr_preview},
+            "PPTX summary model attempt",
+            extra={"chatId": chat_id, "attempt": idx, "model": model},
         )
-        if result.returncode != 0:
-            raise RuntimeError(
-                f"LibreOffice conversion failed rc={result.returncode} stderr={stderr_preview}"
-            )
-        pdf_path = next(iter(Path(tmpdir).glob("*.pdf")), None)
-        if not pdf_path or not pdf_path.exists():
-            raise RuntimeError("LibreOffice conversion failed: no PDF output produced")
-        size = pdf_path.stat().st_size
-        logger.info("LibreOffice convert success", extra={"output_pdf": str(pdf_path), "size": size})
-        return pdf_path.read_bytes()
+        pending[asyncio.create_task(attempt(model))] = model
+
+    launch()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, timeout=stagger, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+            for task in done:
+                model = pending.pop(task)
+                try:
+                    text, stream_message_id = task.result()
+                except Exception as exc:  # keep last error and start the next candidate
+                    last_error = exc
+                    logger.warning(
+                        "PPTX summary model attempt failed",
+                        extra={"chatId": chat_id, "model": model, "error": str(exc)},
+                    )
+                    launch()
+                    continue
+                return text, stream_message_id, model
+    finally:
+        for task in pending:
+            task.cancel()
+        # Let the losers unwind (and record their usage as cancelled) before returning.
+        await asyncio.gather(*pending, return_exceptions=True)
+    raise last_error or RuntimeError("All PPTX summary model attempts failed")
 
 
 @router.post("/summary")
+@file_error_handler(tool="pptx_summary", logger=logger)
 async def summary_pptx(payload: PptxSummaryRequest, request: Request) -> Dict[str, Any]:
     user_id = extract_user_id(request)
     raw_language = payload.language
@@ -97,34 +137,7 @@ async def summary_pptx(payload: PptxSummaryRequest, request: Request) -> Dict[st
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
 
-    logger.info("PPTX summary download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
-    try:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_pptx_mime(mime)
-    except HTTPException as he:
-        return build_success_error_response(
-            tool="pptx_summary",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=he.status_code,
-            detail=he.detail,
-        )
-    except Exception as exc:
-        return build_success_error_response(
-            tool="pptx_summary",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
-    logger.info(
-        "PPTX summary download ok",
-        extra={"chatId": payload.chat_id, "size": len(content), "mime": mime},
-    )
-
-    prompt = (payload.prompt or "").strip() or f"Summarize this presentation in {language} with key sections and bullets."
+    prompt = (payload.prompt or "").strip() or default_pptx_prompt(_DEFAULT_PROMPT, language)
     logger.debug(
         "PPTX summary prompt | chatId=%s userId=%s lang=%s level=%s prompt=%s",
         payload.chat_id,
@@ -133,171 +146,118 @@ async def summary_pptx(payload: PptxSummaryRequest, request: Request) -> Dict[st
         payload.summary_level or "basic",
         prompt,
     )
-    try:
-        # PPTX/PDF: PDF ise direkt, değilse LibreOffice ile PDF'e çevir
-        is_pdf = mime.lower().startswith("application/pdf")
-        if is_pdf:
-            pdf_bytes = content
-        else:
-            suffix = ".pptx"
-            if payload.file_name and "." in payload.file_name:
-                suffix = "." + payload.file_name.split(".")[-1]
-            pdf_bytes = _convert_to_pdf_via_libreoffice(content, suffix=suffix)
-        logger.info(
-            "PPTX summary PDF ready",
-            extra={"chatId": payload.chat_id, "size": len(pdf_bytes), "source_mime": mime},
-        )
-
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        if not gemini_key:
-            raise RuntimeError("GEMINI_API_KEY not set")
-
-        model_candidates = [
-            payload.model if hasattr(payload, "model") else None,
-            os.getenv("GEMINI_PPTX_MODEL"),
-            os.getenv("GEMINI_PDF_MODEL"),
-            "models/gemini-3-flash-preview",
-            "models/gemini-2.5-pro",
-            "models/gemini-2.0-flash-001",
-        ]
-        logger.info("PPTX summary model candidates", extra={"models": model_candidates})
-        seen = set()
-        candidate_models: list[str] = []
-        for m in model_candidates:
-            if not m or m in seen:
-                continue
-            seen.add(m)
-            candidate_models.append(m)
-
-        logger.info("PPTX summary upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", payload.file_name or "slides.pdf", gemini_key)
-        logger.info("PPTX summary upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    if not gemini_key:
+        raise RuntimeError("GEMINI_API_KEY not set")
 
-        streaming_enabled = bool(payload.stream)
-        text: str | None = None
-        stream_message_id = None
-        selected_model: str | None = None
-        last_error: Exception | None = None
+    requested_model = getattr(payload, "model", None)
+    candidate_models = list(dict.fromkeys(filter(None, (requested_model, *_static_candidate_models()))))
+    logger.info("PPTX summary model candidates", extra={"models": candidate_models})
 
-        for idx, model in enumerate(candidate_models):
-            try:
-                parts = [
-                    {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}},
-                    {"text": prompt},
-                ]
-                logger.info(
-                    "PPTX summary model attempt",
-                    extra={"chatId": payload.chat_id, "attempt": idx + 1, "model": model},
-                )
-                usage_context = build_usage_context(
-                    request=request,
-                    user_id=user_id,
-                    endpoint="summary_pptx",
-                    model=model,
-                    payload=payload,
-                )
-                text, stream_message_id = await generate_text_with_optional_stream(
-                    parts=parts,
-                    api_key=gemini_key,
-                    stream=streaming_enabled,
-                    chat_id=payload.chat_id,
-                    tool="pptx_summary",
-                    model=model,
-                    chunk_metadata={
-                        "language": language,
-                        "summaryLevel": payload.summary_level or "basic",
-                        "model": model,
-                    },
-                    tone_key=payload.tone_key,
-                    tone_language=language,
-                    followup_language=language,
-                    usage_context=usage_context,
-                )
-                selected_model = model
-                break
-            except Exception as exc:  # keep last error and continue
-                last_error = exc
-                logger.warning(
-                    "PPTX summary model attempt failed",
-                    extra={"chatId": payload.chat_id, "attempt": idx + 1, "model": model, "error": str(exc)},
-                )
-                continue
+    logger.info("PPTX summary download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+    # PDF is uploaded as-is; anything else is converted by LibreOffice and streamed from disk.
+    file_uri, size, mime = await pptx_url_to_file_uri(
+        payload.file_url, payload.file_name, gemini_key, display_name=payload.file_name or "slides.pdf"
+    )
+    logger.info(
+        "PPTX summary upload ok",
+        extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+    )
 
-        if text is None or selected_model is None:
-            raise last_error or RuntimeError("All PPTX summary model attempts failed")
-        if not text:
-            raise RuntimeError("Empty response from Gemini")
-        logger.info(
-            "PPTX summary gemini response | chatId=%s preview=%s",
-            payload.chat_id,
-            text[:500],
-        )
+    streaming_enabled = bool(payload.stream)
+    parts = build_pdf_parts((file_uri,), prompt)
 
-        response_message_id = (
-            stream_message_id
-            or getattr(payload, "client_message_id", None)
-            or f"pptx_summary_{uuid.uuid4().hex}"
+    async def attempt(model: str) -> Tuple[str, Optional[str]]:
+        usage_context = build_usage_context(
+            request=request,
+            user_id=user_id,
+            endpoint="summary_pptx",
+            model=model,
+            payload=payload,
         )
-
-        extra_fields = {
-            "success": True,
-            "chatId": payload.chat_id,
-            "summary": text,
-            "language": language,
-            "model": selected_model,
-            "summaryLevel": payload.summary_level or "basic",
-        }
-        result = attach_streaming_payload(
-            extra_fields,
+        generation = generate_text_with_optional_stream(
+            parts=parts,
+            api_key=gemini_key,
+            stream=streaming_enabled,
+            chat_id=payload.chat_id,
             tool="pptx_summary",
-            content=text,
-            streaming=bool(stream_message_id),
-            message_id=response_message_id,
-            extra_data={
-                "summary": text,
+            model=model,
+            chunk_metadata={
                 "language": language,
-                "model": selected_model,
                 "summaryLevel": payload.summary_level or "basic",
+                "model": model,
             },
+            tone_key=payload.tone_key,
+            tone_language=language,
+            followup_language=language,
+            usage_context=usage_context,
+            replay_on_stream_failure=True,
         )
+        if streaming_enabled or model == candidate_models[-1]:
+            # A stream that already sent chunks cannot hand over to another model, and the last
+            # candidate has no one to hand over to, so neither is cut off: a large deck may need
+            # longer than one attempt's budget and still finish within the HTTP timeout.
+            return await generation
+        return await asyncio.wait_for(generation, timeout=_model_timeout())
 
-        firestore_ok = save_message_to_firestore(
-            user_id=user_id,
-            chat_id=payload.chat_id,
-            content=text,
-            metadata={
-                "tool": "pptx_summary",
-                "fileUrl": payload.file_url,
-                "fileName": payload.file_name,
-                "summaryLevel": payload.summary_level or "basic",
-                "provider": "gemini",
-            },
-            client_message_id=response_message_id,
-            stream_message_id=stream_message_id,
-        )
-        if firestore_ok:
-            logger.info("PPTX summary Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("PPTX summary Firestore save failed | chatId=%s", payload.chat_id)
-        return result
-    except HTTPException as hexc:
-        logger.error("PPTX summary HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
-        return build_success_error_response(
-            tool="pptx_summary",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=hexc.status_code,
-            detail=hexc.detail,
-        )
-    except Exception as exc:
-        logger.error("PPTX summary failed", exc_info=exc)
-        return build_success_error_response(
-            tool="pptx_summary",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
+    # Hedged attempts would stream two answers into the same chat, so streaming stays sequential.
+    text, stream_message_id, selected_model = await _hedged_generate(
+        candidate_models,
+        attempt,
+        stagger=None if streaming_enabled else _hedge_stagger(),
+        chat_id=payload.chat_id,
+    )
+    if not text:
+        raise RuntimeError("Empty response from Gemini")
+    logger.info(
+        "PPTX summary gemini response | chatId=%s preview=%.500s",
+        payload.chat_id,
+        text,
+    )
+
+    response_message_id = (
+        stream_message_id
+        or getattr(payload, "client_message_id", None)
+        or f"pptx_summary_{uuid.uuid4().hex}"
+    )
 
+    extra_fields = {
+        "success": True,
+        "chatId": payload.chat_id,
+        "summary": text,
+        "language": language,
+        "model": selected_model,
+        "summaryLevel": payload.summary_level or "basic",
+    }
+    result = attach_streaming_payload(
+        extra_fields,
+        tool="pptx_summary",
+        content=text,
+        streaming=bool(stream_message_id),
+        message_id=response_message_id,
+        extra_data={
+            "summary": text,
+            "language": language,
+            "model": selected_model,
+            "summaryLevel": payload.summary_level or "basic",
+        },
+    )
+
+    schedule_firestore_save(
+        logger,
+        "PPTX summary",
+        user_id=user_id,
+        chat_id=payload.chat_id,
+        content=text,
+        metadata={
+            "tool": "pptx_summary",
+            "fileUrl": payload.file_url,
+            "fileName": payload.file_name,
+            "summaryLevel": payload.summary_level or "basic",
+            "provider": "gemini",
+        },
+        client_message_id=response_message_id,
+        stream_message_id=stream_message_id,
+    )
+    return result
@@ -0,0 +1,162 @@
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from core.convert_pool import convert_file_async
+from core.gemini_file_cache import (
+    CONTEXT_CACHE_TTL_SECONDS,
+    cached_content_or_schedule,
+    context_cache_key,
+    file_cache_key_for_path,
+    get_or_upload,
+)
+from errors_response import get_pdf_error_message
+from endpoints.files_pdf.utils import (
+    async_download_file_to_path,
+    create_gemini_cached_content,
+    scratch_tempdir,
+    gemini_file_is_active,
+    upload_file_to_gemini_async,
+    with_gemini_connection_warm,
+)
+
+WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+# Stored lower-case: validate_word_mime compares against the lower-cased header value.
+WORD_MIME_ALLOWED = frozenset(
+    {
+        WORD_MIME_FALLBACK,
+        "application/msword",
+        "application/vnd.ms-word",
+        "application/vnd.ms-word.document.macroenabled.12",
+    }
+)
+
+
+@lru_cache(maxsize=256)
+def default_word_prompt(template: str, language: str) -> str:
+    """`template` with {language} filled in; default prompts only vary by language, so each is built once."""
+    return template.format(language=language)
+
+
+# Longer "extensions" come from dots inside the base name ("Q3.final review"), not real suffixes.
+_MAX_SUFFIX_LEN = 6
+
+
+def word_suffix(file_name: Optional[str]) -> str:
+    if file_name and "." in file_name:
+        suffix = "." + file_name.rsplit(".", 1)[-1]
+        if len(suffix) <= _MAX_SUFFIX_LEN:
+            return suffix
+    return ".docx"
+
+
+PDF_MIME = "application/pdf"
+_PDF_MAGIC = b"%PDF-"
+# .docx/.docm are ZIP containers, legacy .doc is an OLE2 compound file.
+_ZIP_MAGIC = b"PK\x03\x04"
+_OLE2_MAGIC = b"\xd0\xcf\x11\xe0"
+# Enough of the body for validate_word_mime to recognise the container.
+SNIFF_BYTES = 8
+# Content-Types that say nothing about the document, so the body's magic bytes decide instead.
+_GENERIC_MIMES = frozenset({"application/octet-stream", "application/zip"})
+
+
+@lru_cache(maxsize=128)
+def _normalize_word_mime(mime: str) -> Optional[str]:
+    # One split/strip/lower per distinct Content-Type value.
+    head = mime.split(";", 1)[0].strip().lower()
+    if head == PDF_MIME or head in WORD_MIME_ALLOWED or "word" in head:
+        return head
+    return None
+
+
+def validate_word_mime(mime: str, head: bytes = b"") -> str:
+    """
+    Return the normalised (lower-case, parameter-free) mime, or raise 400 for anything else.
+    PDFs come back as "application/pdf" so callers pass them through without conversion. `head`
+    (the first bytes of the body) only decides the type when the Content-Type is missing or one of
+    _GENERIC_MIMES; any other declared type must still be a Word (or PDF) mime.
+    """
+    normalized = _normalize_word_mime(mime) if mime else None
+    if normalized is not None:
+        return PDF_MIME if head.startswith(_PDF_MAGIC) else normalized
+    if not mime or mime.split(";", 1)[0].strip().lower() in _GENERIC_MIMES:
+        if head.startswith(_PDF_MAGIC):
+            return PDF_MIME
+        if head.startswith(_OLE2_MAGIC):
+            return "application/msword"
+        if head.startswith(_ZIP_MAGIC) or not mime:
+            return WORD_MIME_FALLBACK
+    raise HTTPException(
+        status_code=400,
+        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
+    )
+
+
+def _read_head(path: Path) -> bytes:
+    with open(path, "rb") as fh:
+        return fh.read(SNIFF_BYTES)
+
+
+async def word_url_to_file_uri(
+    file_url: str,
+    file_name: Optional[str],
+    api_key: str,
+    *,
+    max_mb: int = 30,
+) -> Tuple[str, int, str]:
+    """
+    Download a document into a scratch dir, convert it there unless it already is a PDF, and upload
+    the PDF from disk; the file content never sits in Python memory. Uploads are cached by the
+    downloaded content, so a repeated document skips both conversion and upload. Returns
+    (file_uri, size, mime).
+    """
+    # Room for the download and the PDF converted from it.
+    with scratch_tempdir("word_", reserve_mb=2 * max_mb) as tmpdir:
+        workdir = Path(tmpdir)
+        src = workdir / f"input{word_suffix(file_name)}"
+        size, mime = await async_download_file_to_path(file_url, src, max_mb=max_mb, require_pdf=False)
+        mime = validate_word_mime(mime, _read_head(src))
+
+        async def _convert_and_upload() -> str:
+            if mime == PDF_MIME:
+                return await upload_file_to_gemini_async(src, PDF_MIME, file_name or "document.pdf", api_key)
+            pdf_path = await with_gemini_connection_warm(convert_file_async(src, workdir))
+            return await upload_file_to_gemini_async(pdf_path, PDF_MIME, pdf_path.name, api_key)
+
+        file_uri = await get_or_upload(
+            await file_cache_key_for_path(src, api_key),
+            _convert_and_upload,
+            partial(gemini_file_is_active, api_key=api_key),
+        )
+        return file_uri, size, mime
+
+
+def word_document_parts(file_uri: str, model: Optional[str], api_key: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Document parts for a prompt about `file_uri`, plus the context cache to send them through.
+    Once a cache for this document and model exists the parts are empty and the cache name is
+    returned, so the document tokens are not billed again at the full input rate.
+    """
+    cached_content = cached_content_or_schedule(
+        context_cache_key(file_uri, model or "", api_key),
+        partial(create_gemini_cached_content, file_uri, model, api_key, ttl_seconds=CONTEXT_CACHE_TTL_SECONDS),
+    )
+    if cached_content:
+        return [], cached_content
+    return [{"file_data": {"mime_type": PDF_MIME, "file_uri": file_uri}}], None
+
+
+__all__ = [
+    "PDF_MIME",
+    "SNIFF_BYTES",
+    "WORD_MIME_FALLBACK",
+    "WORD_MIME_ALLOWED",
+    "default_word_prompt",
+    "validate_word_mime",
+    "word_document_parts",
+    "word_suffix",
+    "word_url_to_file_uri",
+]
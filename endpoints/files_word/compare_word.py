@@ -1,67 +1,35 @@
+import asyncio
 import logging
-import os
-from typing import Any, Dict
+from typing import Any, Dict, Union
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
-from endpoints.helper_fail_response import build_success_error_response
+from endpoints.helper_error_handler import file_error_handler
 from schemas import DocCompareRequest
+from endpoints.files_word._common import default_word_prompt, word_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_word.compare")
 
-router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"])
+router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"], default_response_class=ORJSONResponse)
 
-_WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-_WORD_MIME_ALLOWED = {
-    _WORD_MIME_FALLBACK,
-    "application/msword",
-    "application/vnd.ms-word",
-    "application/vnd.ms-word.document.macroEnabled.12",
-}
 
-
-def _validate_word_mime(mime: str) -> str:
-    if not mime:
-        return _WORD_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _WORD_MIME_ALLOWED:
-        return mime
-    if "word" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
-
-
-def _download_and_convert(file_url: str, file_name: str | None, max_mb: int) -> tuple[bytes, str]:
-    content, mime = download_file(file_url, max_mb=max_mb, require_pdf=False)
-    mime = _validate_word_mime(mime)
-    is_pdf = mime.lower().startswith("application/pdf")
-    if is_pdf:
-        return content, file_name or "document.pdf"
-    suffix = ".docx"
-    if file_name and "." in file_name:
-        suffix = "." + file_name.split(".")[-1]
-    pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-    return pdf_bytes, pdf_filename or file_name or "document.pdf"
+_DEFAULT_PROMPT = "Compare these two documents in {language} and list the differences."
 
 
-@router.post("/compare")
-async def compare_word(payload: DocCompareRequest, request: Request) -> Dict[str, Any]:
+@router.post("/compare", response_model=None)
+@file_error_handler(tool="word_compare", logger=logger)
+async def compare_word(payload: DocCompareRequest, request: Request) -> Union[Dict[str, Any], ORJSONResponse]:
     user_id = extract_user_id(request)
     raw_language = payload.language
     language = normalize_language(raw_language) or "English"
@@ -71,130 +39,89 @@ async def compare_word(payload: DocCompareRequest, request: Request) -> Dict[str
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
 
-    try:
-        logger.info("Word compare download start file1", extra={"chatId": payload.chat_id, "fileUrl": payload.file1})
-        try:
-            pdf1_bytes, pdf1_name = _download_and_convert(payload.file1, payload.file_name, max_mb=30)
-            logger.info("Word compare download start file2", extra={"chatId": payload.chat_id, "fileUrl": payload.file2})
-            pdf2_bytes, pdf2_name = _download_and_convert(payload.file2, payload.file_name, max_mb=30)
-        except HTTPException as he:
-            return build_success_error_response(
-                tool="word_compare",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=he.status_code,
-                detail=he.detail,
-            )
-        except Exception as exc:
-            return build_success_error_response(
-                tool="word_compare",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
-
-        file_uri_1 = upload_to_gemini_files(pdf1_bytes, "application/pdf", pdf1_name, gemini_key)
-        file_uri_2 = upload_to_gemini_files(pdf2_bytes, "application/pdf", pdf2_name, gemini_key)
-        logger.info(
-            "Word compare upload ok",
-            extra={"chatId": payload.chat_id, "fileUri1": file_uri_1, "fileUri2": file_uri_2},
-        )
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
+
+    logger.info("Word compare download start file1", extra={"chatId": payload.chat_id, "fileUrl": payload.file1})
+    logger.info("Word compare download start file2", extra={"chatId": payload.chat_id, "fileUrl": payload.file2})
+    # The two files are independent, so their download/convert/upload pipelines overlap;
+    # each runs from its own scratch dir and never holds the document in memory. The same
+    # URL twice is fetched once; equal content behind different URLs shares one upload
+    # through the upload cache.
+    sources = (payload.file1,) if payload.file1 == payload.file2 else (payload.file1, payload.file2)
+    resolved = await asyncio.gather(
+        *(word_url_to_file_uri(url, payload.file_name, gemini_key, max_mb=30) for url in sources)
+    )
+    file_uri_1, file_uri_2 = resolved[0][0], resolved[-1][0]
+    logger.info(
+        "Word compare upload ok",
+        extra={"chatId": payload.chat_id, "fileUri1": file_uri_1, "fileUri2": file_uri_2},
+    )
 
-        prompt = (payload.prompt or "").strip() or f"Compare these two documents in {language} and list the differences."
-        parts = [
-            {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri_1}},
-            {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri_2}},
-            {"text": prompt},
-        ]
-        usage_context = build_usage_context(
-            request=request,
-            user_id=user_id,
-            endpoint="compare_word",
-            model=effective_model,
-            payload=payload,
-        )
-        text, stream_message_id = await generate_text_with_optional_stream(
-            parts=parts,
-            api_key=gemini_key,
-            stream=bool(payload.stream),
-            chat_id=payload.chat_id,
-            tool="word_compare",
-            model=effective_model,
-            chunk_metadata={"language": language},
-            tone_key=payload.tone_key,
-            tone_language=language,
-            followup_language=language,
-            usage_context=usage_context,
-        )
-        if not text:
-            raise RuntimeError("Empty response from Gemini")
-        logger.info(
-            "Word compare gemini response | chatId=%s preview=%s",
-            payload.chat_id,
-            text[:500],
-        )
+    prompt = (payload.prompt or "").strip() or default_word_prompt(_DEFAULT_PROMPT, language)
+    parts = [
+        {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri_1}},
+        {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri_2}},
+        {"text": prompt},
+    ]
+    usage_context = build_usage_context(
+        request=request,
+        user_id=user_id,
+        endpoint="compare_word",
+        model=effective_model,
+        payload=payload,
+    )
+    text, stream_message_id = await generate_text_with_optional_stream(
+        parts=parts,
+        api_key=gemini_key,
+        stream=bool(payload.stream),
+        chat_id=payload.chat_id,
+        tool="word_compare",
+        model=effective_model,
+        chunk_metadata={"language": language},
+        tone_key=payload.tone_key,
+        tone_language=language,
+        followup_language=language,
+        usage_context=usage_context,
+    )
+    if not text:
+        raise RuntimeError("Empty response from Gemini")
+    logger.info(
+        "Word compare gemini response | chatId=%s preview=%.500s",
+        payload.chat_id,
+        text,
+    )
 
-        base_payload = {
-            "success": True,
-            "chatId": payload.chat_id,
-            "comparison": text,
-            "language": language,
-            "model": effective_model,
-        }
-        result = attach_streaming_payload(
-            base_payload,
-            tool="word_compare",
-            content=text,
-            streaming=bool(stream_message_id),
-            message_id=stream_message_id,
-            extra_data={
-                "comparison": text,
-                "language": language,
-                "model": effective_model,
-            },
-        )
+    # The response body and data payload carry the same fields; build them once.
+    core_fields = {
+        "comparison": text,
+        "language": language,
+        "model": effective_model,
+    }
+    result = attach_streaming_payload(
+        {"success": True, "chatId": payload.chat_id, **core_fields},
+        tool="word_compare",
+        content=text,
+        streaming=bool(stream_message_id),
+        message_id=stream_message_id,
+        extra_data=core_fields,
+    )
 
-        firestore_ok = save_message_to_firestore(
-            user_id=user_id,
-            chat_id=payload.chat_id,
-            content=text,
-            metadata={
-                "tool": "word_compare",
-                "file1": payload.file1,
-                "file2": payload.file2,
-                "fileName": payload.file_name,
-            },
-            client_message_id=getattr(payload, "client_message_id", None),
-            stream_message_id=stream_message_id,
-        )
-        if firestore_ok:
-            logger.info("Word compare Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("Word compare Firestore save failed | chatId=%s", payload.chat_id)
-        return result
-    except HTTPException as hexc:
-        logger.error("Word compare HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
-        return build_success_error_response(
-            tool="word_compare",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=hexc.status_code,
-            detail=hexc.detail,
-        )
-    except Exception as exc:
-        logger.error("Word compare failed", exc_info=exc)
-        return build_success_error_response(
-            tool="word_compare",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
+    schedule_firestore_save(
+        logger,
+        "Word compare",
+        user_id=user_id,
+        chat_id=payload.chat_id,
+        content=text,
+        metadata={
+            "tool": "word_compare",
+            "file1": payload.file1,
+            "file2": payload.file2,
+            "fileName": payload.file_name,
+        },
+        client_message_id=getattr(payload, "client_message_id", None),
+        stream_message_id=stream_message_id,
+    )
+    # Already JSON-ready; returning the response skips jsonable_encoder.
+    return ORJSONResponse(result)
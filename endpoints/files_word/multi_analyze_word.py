@@ -1,73 +1,58 @@
+import asyncio
 import logging
-import os
-from typing import Any, Dict
+from typing import Any, Dict, Union
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
-from endpoints.helper_fail_response import build_success_error_response
+from endpoints.helper_error_handler import file_error_handler
 from schemas import DocMultiAnalyzeRequest
+from endpoints.files_word._common import default_word_prompt, word_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
+    build_pdf_parts,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_word.multi_analyze")
 
-router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"])
-
-_WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-_WORD_MIME_ALLOWED = {
-    _WORD_MIME_FALLBACK,
-    "application/msword",
-    "application/vnd.ms-word",
-    "application/vnd.ms-word.document.macroEnabled.12",
-}
-
-
-def _validate_word_mime(mime: str) -> str:
-    if not mime:
-        return _WORD_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _WORD_MIME_ALLOWED:
-        return mime
-    if "word" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"], default_response_class=ORJSONResponse)
+
+
+# Each in-flight URL reserves its own scratch space, so once tmpfs is spoken for the rest go to disk.
+_URL_CONCURRENCY = 8
+
+
+async def _convert_urls_to_file_uris(file_urls: list[str], file_name: str | None, max_mb: int, api_key: str) -> list[str]:
+    """
+    Resolve every distinct URL concurrently (download, convert, upload); LibreOffice runs stay bounded
+    by the conversion pool. A URL repeated in the batch is resolved once, and different URLs serving
+    the same content share one upload through the upload cache. The result follows file_urls.
+    """
+    semaphore = asyncio.Semaphore(_URL_CONCURRENCY)
+
+    async def _one(url: str) -> str:
+        async with semaphore:
+            file_uri, _, _ = await word_url_to_file_uri(url, file_name, api_key, max_mb=max_mb)
+            return file_uri
+
+    unique_urls = list(dict.fromkeys(file_urls))
+    resolved = dict(zip(unique_urls, await asyncio.gather(*(_one(url) for url in unique_urls))))
+    return [resolved[url] for url in file_urls]
+
 
+_DEFAULT_PROMPT = "Analyze these documents together in {language} and summarize key insights."
 
-def _convert_urls_to_file_uris(file_urls: list[str], file_name: str | None, max_mb: int, api_key: str) -> list[str]:
-    uris: list[str] = []
-    for url in file_urls:
-        content, mime = download_file(url, max_mb=max_mb, require_pdf=False)
-        mime = _validate_word_mime(mime)
-        is_pdf = mime.lower().startswith("application/pdf")
-        if is_pdf:
-            pdf_bytes = content
-            pdf_filename = file_name or "document.pdf"
-        else:
-            suffix = ".docx"
-            if file_name and "." in file_name:
-                suffix = "." + file_name.split(".")[-1]
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, api_key)
-        uris.append(uri)
-    return uris
-
-
-@router.post("/multi_analyze")
-async def multi_analyze_word(payload: DocMultiAnalyzeRequest, request: Request) -> Dict[str, Any]:
+
+@router.post("/multi_analyze", response_model=None)
+@file_error_handler(tool="word_multi_analyze", logger=logger)
+async def multi_analyze_word(payload: DocMultiAnalyzeRequest, request: Request) -> Union[Dict[str, Any], ORJSONResponse]:
     user_id = extract_user_id(request)
     raw_language = payload.language
     language = normalize_language(raw_language) or "English"
@@ -77,118 +62,79 @@ async def multi_analyze_word(payload: DocMultiAnalyzeRequest, request: Request)
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileCount": len(payload.file_urls)},
     )
 
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
-
-    try:
-        logger.info("Word multi_analyze converting/uploading files", extra={"chatId": payload.chat_id})
-        try:
-            file_uris = _convert_urls_to_file_uris(payload.file_urls, payload.file_name, max_mb=50, api_key=gemini_key)
-        except HTTPException as he:
-            return build_success_error_response(
-                tool="word_multi_analyze",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=he.status_code,
-                detail=he.detail,
-            )
-        except Exception as exc:
-            return build_success_error_response(
-                tool="word_multi_analyze",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-        logger.info("Word multi_analyze file URIs ready", extra={"chatId": payload.chat_id, "count": len(file_uris)})
-
-        prompt = (payload.prompt or "").strip() or f"Analyze these documents together in {language} and summarize key insights."
-        parts = [{"file_data": {"mime_type": "application/pdf", "file_uri": uri}} for uri in file_uris]
-        parts.append({"text": prompt})
-
-        usage_context = build_usage_context(
-            request=request,
-            user_id=user_id,
-            endpoint="multi_analyze_word",
-            model=effective_model,
-            payload=payload,
-        )
-        text, stream_message_id = await generate_text_with_optional_stream(
-            parts=parts,
-            api_key=gemini_key,
-            stream=bool(payload.stream),
-            chat_id=payload.chat_id,
-            tool="word_multi_analyze",
-            model=effective_model,
-            chunk_metadata={"language": language},
-            tone_key=payload.tone_key,
-            tone_language=language,
-            followup_language=language,
-            usage_context=usage_context,
-        )
-        if not text:
-            raise RuntimeError("Empty response from Gemini")
-        logger.info(
-            "Word multi_analyze gemini response | chatId=%s preview=%s",
-            payload.chat_id,
-            text[:500],
-        )
-
-        extra_fields = {
-            "success": True,
-            "chatId": payload.chat_id,
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
+
+    logger.info("Word multi_analyze converting/uploading files", extra={"chatId": payload.chat_id})
+    file_uris = await _convert_urls_to_file_uris(payload.file_urls, payload.file_name, max_mb=50, api_key=gemini_key)
+    logger.info("Word multi_analyze file URIs ready", extra={"chatId": payload.chat_id, "count": len(file_uris)})
+
+    prompt = (payload.prompt or "").strip() or default_word_prompt(_DEFAULT_PROMPT, language)
+    # One part per distinct upload: a repeated URL or identical content resolves to the same URI,
+    # and sending it twice would only bill the document tokens twice.
+    parts = build_pdf_parts(dict.fromkeys(file_uris), prompt)
+
+    usage_context = build_usage_context(
+        request=request,
+        user_id=user_id,
+        endpoint="multi_analyze_word",
+        model=effective_model,
+        payload=payload,
+    )
+    text, stream_message_id = await generate_text_with_optional_stream(
+        parts=parts,
+        api_key=gemini_key,
+        stream=bool(payload.stream),
+        chat_id=payload.chat_id,
+        tool="word_multi_analyze",
+        model=effective_model,
+        chunk_metadata={"language": language},
+        tone_key=payload.tone_key,
+        tone_language=language,
+        followup_language=language,
+        usage_context=usage_context,
+    )
+    if not text:
+        raise RuntimeError("Empty response from Gemini")
+    logger.info(
+        "Word multi_analyze gemini response | chatId=%s preview=%.500s",
+        payload.chat_id,
+        text,
+    )
+
+    extra_fields = {
+        "success": True,
+        "chatId": payload.chat_id,
+        "analysis": text,
+        "language": language,
+        "model": effective_model,
+    }
+    result = attach_streaming_payload(
+        extra_fields,
+        tool="word_multi_analyze",
+        content=text,
+        streaming=bool(stream_message_id),
+        message_id=stream_message_id,
+        extra_data={
             "analysis": text,
             "language": language,
             "model": effective_model,
-        }
-        result = attach_streaming_payload(
-            extra_fields,
-            tool="word_multi_analyze",
-            content=text,
-            streaming=bool(stream_message_id),
-            message_id=stream_message_id,
-            extra_data={
-                "analysis": text,
-                "language": language,
-                "model": effective_model,
-            },
-        )
-        firestore_ok = save_message_to_firestore(
-            user_id=user_id,
-            chat_id=payload.chat_id,
-            content=text,
-            metadata={
-                "tool": "word_multi_analyze",
-                "fileUrls": payload.file_urls,
-                "fileName": payload.file_name,
-            },
-            client_message_id=getattr(payload, "client_message_id", None),
-            stream_message_id=stream_message_id,
-        )
-        if firestore_ok:
-            logger.info("Word multi_analyze Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("Word multi_analyze Firestore save failed | chatId=%s", payload.chat_id)
-        return result
-    except HTTPException as hexc:
-        logger.error("Word multi_analyze HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
-        return build_success_error_response(
-            tool="word_multi_analyze",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=hexc.status_code,
-            detail=hexc.detail,
-        )
-    except Exception as exc:
-        logger.error("Word multi_analyze failed", exc_info=exc)
-        return build_success_error_response(
-            tool="word_multi_analyze",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
+        },
+    )
+    schedule_firestore_save(
+        logger,
+        "Word multi_analyze",
+        user_id=user_id,
+        chat_id=payload.chat_id,
+        content=text,
+        metadata={
+            "tool": "word_multi_analyze",
+            "fileUrls": payload.file_urls,
+            "fileName": payload.file_name,
+        },
+        client_message_id=getattr(payload, "client_message_id", None),
+        stream_message_id=stream_message_id,
+    )
+    # Already JSON-ready; returning the response skips jsonable_encoder.
+    return ORJSONResponse(result)
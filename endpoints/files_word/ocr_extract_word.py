@@ -1,19 +1,20 @@
 import logging
-import os
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
+from core.convert_pool import convert_async
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import DocOcrExtractRequest
+from endpoints.files_word._common import PDF_MIME, SNIFF_BYTES, default_word_prompt, validate_word_mime, word_suffix
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
+    async_download_file,
+    upload_to_gemini_files_async,
     generate_text_with_optional_stream,
     save_message_to_firestore,
     log_full_payload,
@@ -22,29 +23,10 @@ from endpoints.files_pdf.utils import (
 
 logger = logging.getLogger("pdf_read_refresh.files_word.ocr_extract")
 
-router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"])
+router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"], default_response_class=ORJSONResponse)
 
-_WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-_WORD_MIME_ALLOWED = {
-    _WORD_MIME_FALLBACK,
-    "application/msword",
-    "application/vnd.ms-word",
-    "application/vnd.ms-word.document.macroEnabled.12",
-}
 
-
-def _validate_word_mime(mime: str) -> str:
-    if not mime:
-        return _WORD_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _WORD_MIME_ALLOWED:
-        return mime
-    if "word" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+_DEFAULT_PROMPT = "Extract text (OCR if needed) from this document in {language}."
 
 
 @router.post("/ocr_extract")
@@ -60,8 +42,8 @@ async def ocr_extract_word(payload: DocOcrExtractRequest, request: Request) -> D
 
     logger.info("Word OCR extract download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
     try:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_word_mime(mime)
+        content, mime = await async_download_file(payload.file_url, max_mb=30, require_pdf=False)
+        mime = validate_word_mime(mime, content[:SNIFF_BYTES])
     except HTTPException as he:
         return build_success_error_response(
             tool="word_ocr_extract",
@@ -82,16 +64,14 @@ async def ocr_extract_word(payload: DocOcrExtractRequest, request: Request) -> D
         )
     logger.info("Word OCR extract download ok", extra={"chatId": payload.chat_id, "size": len(content), "mime": mime})
 
-    is_pdf = mime.lower().startswith("application/pdf")
+    is_pdf = mime == PDF_MIME
     if is_pdf:
         pdf_bytes = content
         pdf_filename = payload.file_name or "document.pdf"
     else:
-        suffix = ".docx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
+        suffix = word_suffix(payload.file_name)
         try:
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
+            pdf_bytes, pdf_filename = await convert_async(content, suffix=suffix)
         except Exception as exc:
             return build_success_error_response(
                 tool="word_ocr_extract",
@@ -102,10 +82,11 @@ async def ocr_extract_word(payload: DocOcrExtractRequest, request: Request) -> D
                 detail=str(exc),
             )
 
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
 
-    prompt_text = (payload.prompt or "").strip() or f"Extract text (OCR if needed) from this document in {language}."
+    prompt_text = (payload.prompt or "").strip() or default_word_prompt(_DEFAULT_PROMPT, language)
     logger.debug(
         "Word OCR extract prompt | chatId=%s userId=%s lang=%s prompt=%s",
         payload.chat_id,
@@ -115,7 +96,7 @@ async def ocr_extract_word(payload: DocOcrExtractRequest, request: Request) -> D
     )
     try:
         logger.info("Word OCR extract upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, gemini_key)
+        file_uri = await upload_to_gemini_files_async(pdf_bytes, "application/pdf", pdf_filename, gemini_key)
         logger.info("Word OCR extract upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
         parts = [
             {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}},
@@ -146,9 +127,9 @@ async def ocr_extract_word(payload: DocOcrExtractRequest, request: Request) -> D
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "Word OCR extract gemini response | chatId=%s preview=%s",
+            "Word OCR extract gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         extra_fields = {
@@ -1,72 +1,60 @@
 import logging
-import os
-from typing import Any, Dict
+from functools import partial
+from typing import Any, Dict, Union
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
+from core.gemini_file_cache import get_or_upload, url_cache_key
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
 from errors_response import get_pdf_error_message
-from endpoints.helper_fail_response import build_success_error_response
+from endpoints.helper_error_handler import file_error_handler
 from schemas import DocQnaRequest
+from endpoints.files_word._common import default_word_prompt, word_document_parts, word_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
+    gemini_file_is_active,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_word.qna")
 
-router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"])
+router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"], default_response_class=ORJSONResponse)
 
-_WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-_WORD_MIME_ALLOWED = {
-    _WORD_MIME_FALLBACK,
-    "application/msword",
-    "application/vnd.ms-word",
-    "application/vnd.ms-word.document.macroEnabled.12",
-}
 
-
-def _validate_word_mime(mime: str) -> str:
-    if not mime:
-        return _WORD_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _WORD_MIME_ALLOWED:
-        return mime
-    if "word" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+_DEFAULT_PROMPT = "Answer the user's question. Answer in {language}. Maintain citations if available."
 
 
-def _ensure_file_uri(payload: DocQnaRequest, api_key: str) -> str:
+async def _ensure_file_uri(payload: DocQnaRequest, api_key: str) -> str:
     if payload.file_id:
         return payload.file_id
     if payload.file_url:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_word_mime(mime)
-        suffix = ".docx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
-        pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        display_name = pdf_filename or payload.file_name or "document.pdf"
-        return upload_to_gemini_files(pdf_bytes, "application/pdf", display_name, api_key)
+        file_url = payload.file_url
+
+        async def _resolve() -> str:
+            file_uri, _, _ = await word_url_to_file_uri(file_url, payload.file_name, api_key, max_mb=30)
+            return file_uri
+
+        # Follow-up questions usually repeat the URL; a remembered, still ACTIVE upload skips the download too.
+        return await get_or_upload(
+            url_cache_key(file_url, api_key, payload.file_name or ""),
+            _resolve,
+            partial(gemini_file_is_active, api_key=api_key),
+        )
     raise HTTPException(
         status_code=400,
         detail={"success": False, "error": "invalid_file_url", "message": get_pdf_error_message("invalid_file_url", payload.language)},
     )
 
 
-@router.post("/qna")
-async def qna_word(payload: DocQnaRequest, request: Request) -> Dict[str, Any]:
+@router.post("/qna", response_model=None)
+@file_error_handler(tool="word_qna", logger=logger)
+async def qna_word(payload: DocQnaRequest, request: Request) -> Union[Dict[str, Any], ORJSONResponse]:
     user_id = extract_user_id(request)
     raw_language = payload.language
     language = normalize_language(raw_language) or "English"
@@ -75,136 +63,103 @@ async def qna_word(payload: DocQnaRequest, request: Request) -> Dict[str, Any]:
         "Word QnA request",
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
-    logger.debug(
-        "Word QnA question received",
-        extra={
-            "chatId": payload.chat_id,
-            "userId": user_id,
-            "language": language,
-            "question": (payload.question or "")[:500],
-        },
-    )
-
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
-    try:
-        logger.info("Word QnA ensure file", extra={"chatId": payload.chat_id, "fileId": payload.file_id, "fileUrl": payload.file_url})
-        try:
-            file_uri = _ensure_file_uri(payload, gemini_key)
-        except HTTPException as he:
-            return build_success_error_response(
-                tool="word_qna",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=he.status_code,
-                detail=he.detail,
-            )
-        except Exception as exc:
-            return build_success_error_response(
-                tool="word_qna",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-        logger.info("Word QnA file ready", extra={"chatId": payload.chat_id, "fileUri": file_uri})
-        user_prompt = (payload.prompt or "").strip()
-        instructions = user_prompt or f"Answer in {language}. Maintain citations if available."
-        parts = [
-            {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}},
-            {"text": f"Answer the user's question. {instructions}"},
-            {"text": payload.question},
-        ]
-        usage_context = build_usage_context(
-            request=request,
-            user_id=user_id,
-            endpoint="qna_word",
-            model=effective_model,
-            payload=payload,
-        )
-        answer, stream_message_id = await generate_text_with_optional_stream(
-            parts=parts,
-            api_key=gemini_key,
-            stream=bool(payload.stream),
-            chat_id=payload.chat_id,
-            tool="word_qna",
-            model=effective_model,
-            chunk_metadata={
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Word QnA question received",
+            extra={
+                "chatId": payload.chat_id,
+                "userId": user_id,
                 "language": language,
-                "question": payload.question,
+                "question": (payload.question or "")[:500],
             },
-            tone_key=payload.tone_key,
-            tone_language=language,
-            followup_language=language,
-            usage_context=usage_context,
         )
-        if not answer:
-            msg = get_pdf_error_message("no_answer_found", language)
-            raise HTTPException(
-                status_code=404,
-                detail={"success": False, "error": "no_answer_found", "message": msg},
-            )
-        logger.info(
-            "Word QnA gemini response | chatId=%s preview=%s",
-            payload.chat_id,
-            answer[:500],
+
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
+    logger.info("Word QnA ensure file", extra={"chatId": payload.chat_id, "fileId": payload.file_id, "fileUrl": payload.file_url})
+    file_uri = await _ensure_file_uri(payload, gemini_key)
+    logger.info("Word QnA file ready", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+    user_prompt = (payload.prompt or "").strip()
+    instructions = (
+        f"Answer the user's question. {user_prompt}" if user_prompt else default_word_prompt(_DEFAULT_PROMPT, language)
+    )
+    # The question is the only part that changes between turns; the document comes from the
+    # context cache once one exists for this file and model.
+    document_parts, cached_content = word_document_parts(file_uri, effective_model, gemini_key)
+    parts = [
+        *document_parts,
+        {"text": instructions},
+        {"text": payload.question},
+    ]
+    usage_context = build_usage_context(
+        request=request,
+        user_id=user_id,
+        endpoint="qna_word",
+        model=effective_model,
+        payload=payload,
+    )
+    answer, stream_message_id = await generate_text_with_optional_stream(
+        parts=parts,
+        api_key=gemini_key,
+        stream=bool(payload.stream),
+        chat_id=payload.chat_id,
+        tool="word_qna",
+        model=effective_model,
+        chunk_metadata={
+            "language": language,
+            "question": payload.question,
+        },
+        tone_key=payload.tone_key,
+        tone_language=language,
+        followup_language=language,
+        usage_context=usage_context,
+        cached_content=cached_content,
+    )
+    if not answer:
+        msg = get_pdf_error_message("no_answer_found", language)
+        raise HTTPException(
+            status_code=404,
+            detail={"success": False, "error": "no_answer_found", "message": msg},
         )
+    logger.info(
+        "Word QnA gemini response | chatId=%s preview=%.500s",
+        payload.chat_id,
+        answer,
+    )
 
-        extra_fields = {
-            "success": True,
-            "chatId": payload.chat_id,
+    extra_fields = {
+        "success": True,
+        "chatId": payload.chat_id,
+        "answer": answer,
+        "language": language,
+        "model": effective_model,
+    }
+    result = attach_streaming_payload(
+        extra_fields,
+        tool="word_qna",
+        content=answer,
+        streaming=bool(stream_message_id),
+        message_id=stream_message_id,
+        extra_data={
             "answer": answer,
             "language": language,
             "model": effective_model,
-        }
-        result = attach_streaming_payload(
-            extra_fields,
-            tool="word_qna",
-            content=answer,
-            streaming=bool(stream_message_id),
-            message_id=stream_message_id,
-            extra_data={
-                "answer": answer,
-                "language": language,
-                "model": effective_model,
-            },
-        )
-        firestore_ok = save_message_to_firestore(
-            user_id=user_id,
-            chat_id=payload.chat_id,
-            content=answer,
-            metadata={
-                "tool": "word_qna",
-                "fileUri": file_uri,
-                "fileName": payload.file_name,
-            },
-            client_message_id=getattr(payload, "client_message_id", None),
-            stream_message_id=stream_message_id,
-        )
-        if firestore_ok:
-            logger.info("Word QnA Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("Word QnA Firestore save failed | chatId=%s", payload.chat_id)
-        return result
-    except HTTPException as hexc:
-        logger.error("Word QnA HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
-        return build_success_error_response(
-            tool="word_qna",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=hexc.status_code,
-            detail=hexc.detail,
-        )
-    except Exception as exc:
-        logger.error("Word QnA failed", exc_info=exc)
-        return build_success_error_response(
-            tool="word_qna",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
+        },
+    )
+    schedule_firestore_save(
+        logger,
+        "Word QnA",
+        user_id=user_id,
+        chat_id=payload.chat_id,
+        content=answer,
+        metadata={
+            "tool": "word_qna",
+            "fileUri": file_uri,
+            "fileName": payload.file_name,
+        },
+        client_message_id=getattr(payload, "client_message_id", None),
+        stream_message_id=stream_message_id,
+    )
+    # Already JSON-ready; returning the response skips jsonable_encoder.
+    return ORJSONResponse(result)
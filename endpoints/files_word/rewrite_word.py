@@ -1,50 +1,29 @@
 import logging
-import os
 from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import DocRewriteRequest
+from endpoints.files_word._common import default_word_prompt, word_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_word.rewrite")
 
-router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"])
+router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"], default_response_class=ORJSONResponse)
 
-_WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-_WORD_MIME_ALLOWED = {
-    _WORD_MIME_FALLBACK,
-    "application/msword",
-    "application/vnd.ms-word",
-    "application/vnd.ms-word.document.macroEnabled.12",
-}
 
-
-def _validate_word_mime(mime: str) -> str:
-    if not mime:
-        return _WORD_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _WORD_MIME_ALLOWED:
-        return mime
-    if "word" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+_DEFAULT_PROMPT = "Rewrite this document in {language}."
 
 
 @router.post("/rewrite")
@@ -58,54 +37,11 @@ async def rewrite_word(payload: DocRewriteRequest, request: Request) -> Dict[str
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
 
-    logger.info("Word rewrite download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
-    try:
-        content, mime = download_file(payload.file_url, max_mb=30, require_pdf=False)
-        mime = _validate_word_mime(mime)
-    except HTTPException as he:
-        return build_success_error_response(
-            tool="word_rewrite",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=he.status_code,
-            detail=he.detail,
-        )
-    except Exception as exc:
-        return build_success_error_response(
-            tool="word_rewrite",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
-    logger.info("Word rewrite download ok", extra={"chatId": payload.chat_id, "size": len(content), "mime": mime})
-
-    is_pdf = mime.lower().startswith("application/pdf")
-    if is_pdf:
-        pdf_bytes = content
-        pdf_filename = payload.file_name or "document.pdf"
-    else:
-        suffix = ".docx"
-        if payload.file_name and "." in payload.file_name:
-            suffix = "." + payload.file_name.split(".")[-1]
-        try:
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        except Exception as exc:
-            return build_success_error_response(
-                tool="word_rewrite",
-                language=language,
-                chat_id=payload.chat_id,
-                user_id=user_id,
-                status_code=500,
-                detail=str(exc),
-            )
-
-    gemini_key = os.getenv("GEMINI_API_KEY")
-    effective_model = payload.model or os.getenv("GEMINI_PDF_MODEL") or "gemini-2.5-flash"
+    config = get_gemini_config()
+    gemini_key = config.api_key
+    effective_model = payload.model or config.pdf_model
 
-    prompt_text = (payload.prompt or "").strip() or f"Rewrite this document in {language}."
+    prompt_text = (payload.prompt or "").strip() or default_word_prompt(_DEFAULT_PROMPT, language)
     if payload.style:
         prompt_text += f" Style: {payload.style}"
     logger.debug(
@@ -116,9 +52,13 @@ async def rewrite_word(payload: DocRewriteRequest, request: Request) -> Dict[str
         prompt_text,
     )
     try:
-        logger.info("Word rewrite upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename, gemini_key)
-        logger.info("Word rewrite upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+        logger.info("Word rewrite download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+        # Downloaded, converted and uploaded from disk; the document never sits in memory.
+        file_uri, size, mime = await word_url_to_file_uri(payload.file_url, payload.file_name, gemini_key, max_mb=30)
+        logger.info(
+            "Word rewrite upload ok",
+            extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+        )
         parts = [
             {"file_data": {"mime_type": "application/pdf", "file_uri": file_uri}},
             {"text": prompt_text},
@@ -149,9 +89,9 @@ async def rewrite_word(payload: DocRewriteRequest, request: Request) -> Dict[str
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "Word rewrite gemini response | chatId=%s preview=%s",
+            "Word rewrite gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         extra_fields = {
@@ -173,7 +113,9 @@ async def rewrite_word(payload: DocRewriteRequest, request: Request) -> Dict[str
                 "model": effective_model,
             },
         )
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "Word rewrite",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=text,
@@ -186,10 +128,6 @@ async def rewrite_word(payload: DocRewriteRequest, request: Request) -> Dict[str
             client_message_id=getattr(payload, "client_message_id", None),
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("Word rewrite Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("Word rewrite Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("Word rewrite HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
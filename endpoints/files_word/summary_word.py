@@ -1,52 +1,37 @@
 import logging
-import os
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 
+from core.gemini_config import get_gemini_config
+from core.gemini_rate_limit import MAX_WAIT_SECONDS
 from core.language_support import normalize_language
-from core.word_to_pdf import convert_word_bytes_to_pdf_bytes
-from errors_response import get_pdf_error_message
 from endpoints.helper_fail_response import build_success_error_response
 from schemas import DocSummaryRequest
+from endpoints.files_word._common import default_word_prompt, word_url_to_file_uri
 from endpoints.files_pdf.utils import (
     extract_user_id,
     build_usage_context,
-    download_file,
-    upload_to_gemini_files,
     generate_text_with_optional_stream,
-    save_message_to_firestore,
+    gemini_retry_after,
+    schedule_firestore_save,
     log_full_payload,
     attach_streaming_payload,
 )
 
 logger = logging.getLogger("pdf_read_refresh.files_word.summary")
 
-router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"])
+router = APIRouter(prefix="/api/v1/files/word", tags=["FilesWord"], default_response_class=ORJSONResponse)
 
 
-_WORD_MIME_FALLBACK = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-_WORD_MIME_ALLOWED = {
-    _WORD_MIME_FALLBACK,
-    "application/msword",
-    "application/vnd.ms-word",
-    "application/vnd.ms-word.document.macroEnabled.12",
-}
+# Gemini rejections that do not depend on the model: an unusable key. A 400 may be a feature only
+# some models reject, and not found (404) is per model, so those still move on to the next candidate.
+_NON_MODEL_ERRORS = frozenset({401, 403})
 
 
-def _validate_word_mime(mime: str) -> str:
-    if not mime:
-        return _WORD_MIME_FALLBACK
-    mime = mime.split(";")[0].strip()
-    if mime.lower() in _WORD_MIME_ALLOWED:
-        return mime
-    if "word" in mime.lower():
-        return mime
-    raise HTTPException(
-        status_code=400,
-        detail={"success": False, "error": "invalid_file_type", "message": get_pdf_error_message("invalid_file_url", None)},
-    )
+_DEFAULT_PROMPT = "Summarize this Word document in {language} with any useful structure you choose."
 
 
 @router.post("/summary")
@@ -60,34 +45,7 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
         extra={"chatId": payload.chat_id, "userId": user_id, "language": language, "fileName": payload.file_name},
     )
 
-    logger.info("Word summary download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
-    try:
-        content, mime = download_file(payload.file_url, max_mb=20, require_pdf=False)
-        mime = _validate_word_mime(mime)
-    except HTTPException as he:
-        return build_success_error_response(
-            tool="word_summary",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=he.status_code,
-            detail=he.detail,
-        )
-    except Exception as exc:
-        return build_success_error_response(
-            tool="word_summary",
-            language=language,
-            chat_id=payload.chat_id,
-            user_id=user_id,
-            status_code=500,
-            detail=str(exc),
-        )
-    logger.info(
-        "Word summary download ok",
-        extra={"chatId": payload.chat_id, "size": len(content), "mime": mime},
-    )
-
-    prompt = (payload.prompt or "").strip() or f"Summarize this Word document in {language} with any useful structure you choose."
+    prompt = (payload.prompt or "").strip() or default_word_prompt(_DEFAULT_PROMPT, language)
     logger.debug(
         "Word summary prompt | chatId=%s userId=%s lang=%s level=%s prompt=%s",
         payload.chat_id,
@@ -97,29 +55,15 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
         prompt,
     )
     try:
-        # Word/PDF: PDF ise direkt, değilse LibreOffice ile PDF'e çevir
-        is_pdf = mime.lower().startswith("application/pdf")
-        if is_pdf:
-            pdf_bytes = content
-            pdf_filename = payload.file_name or "document.pdf"
-        else:
-            suffix = ".docx"
-            if payload.file_name and "." in payload.file_name:
-                suffix = "." + payload.file_name.split(".")[-1]
-            pdf_bytes, pdf_filename = convert_word_bytes_to_pdf_bytes(content, suffix=suffix)
-        logger.info(
-            "Word summary PDF ready",
-            extra={"chatId": payload.chat_id, "size": len(pdf_bytes), "source_mime": mime},
-        )
-
-        gemini_key = os.getenv("GEMINI_API_KEY")
+        config = get_gemini_config()
+        gemini_key = config.api_key
         if not gemini_key:
             raise RuntimeError("GEMINI_API_KEY not set")
 
         model_candidates = [
             payload.model if hasattr(payload, "model") else None,
-            os.getenv("GEMINI_DOC_MODEL"),
-            os.getenv("GEMINI_PDF_MODEL"),
+            config.doc_model_env,
+            config.pdf_model_env,
             "models/gemini-3-flash-preview",
             "models/gemini-2.5-pro",
             "models/gemini-2.0-flash-001",
@@ -133,9 +77,13 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
             seen.add(m)
             candidate_models.append(m)
 
-        logger.info("Word summary upload start", extra={"chatId": payload.chat_id})
-        file_uri = upload_to_gemini_files(pdf_bytes, "application/pdf", pdf_filename or "document.pdf", gemini_key)
-        logger.info("Word summary upload ok", extra={"chatId": payload.chat_id, "fileUri": file_uri})
+        logger.info("Word summary download start", extra={"chatId": payload.chat_id, "fileUrl": payload.file_url})
+        # Downloaded, converted and uploaded from disk; the document never sits in memory.
+        file_uri, size, mime = await word_url_to_file_uri(payload.file_url, payload.file_name, gemini_key, max_mb=20)
+        logger.info(
+            "Word summary upload ok",
+            extra={"chatId": payload.chat_id, "fileUri": file_uri, "size": size, "mime": mime},
+        )
 
         streaming_enabled = bool(payload.stream)
         text: str | None = None
@@ -185,6 +133,19 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
                     "Word summary model attempt failed",
                     extra={"chatId": payload.chat_id, "attempt": idx + 1, "model": model, "error": str(exc)},
                 )
+                if not isinstance(exc, HTTPException):
+                    continue
+                if exc.status_code in _NON_MODEL_ERRORS:
+                    # The key is at fault; every other model would fail the same way.
+                    break
+                retry_after = gemini_retry_after(exc) if exc.status_code == 429 else None
+                if retry_after is not None and retry_after > MAX_WAIT_SECONDS:
+                    # The key's limiter would fail the next attempt fast rather than wait this long.
+                    logger.warning(
+                        "Word summary quota pause exceeds the retry budget",
+                        extra={"chatId": payload.chat_id, "retryAfter": retry_after},
+                    )
+                    break
                 continue
 
         if text is None or selected_model is None:
@@ -192,9 +153,9 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
         if not text:
             raise RuntimeError("Empty response from Gemini")
         logger.info(
-            "Word summary gemini response | chatId=%s preview=%s",
+            "Word summary gemini response | chatId=%s preview=%.500s",
             payload.chat_id,
-            text[:500],
+            text,
         )
 
         response_message_id = (
@@ -225,7 +186,9 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
             },
         )
 
-        firestore_ok = save_message_to_firestore(
+        schedule_firestore_save(
+            logger,
+            "Word summary",
             user_id=user_id,
             chat_id=payload.chat_id,
             content=text,
@@ -239,10 +202,6 @@ async def summary_word(payload: DocSummaryRequest, request: Request) -> Dict[str
             client_message_id=response_message_id,
             stream_message_id=stream_message_id,
         )
-        if firestore_ok:
-            logger.info("Word summary Firestore save success | chatId=%s", payload.chat_id)
-        else:
-            logger.error("Word summary Firestore save failed | chatId=%s", payload.chat_id)
         return result
     except HTTPException as hexc:
         logger.error("Word summary HTTPException", exc_info=hexc, extra={"chatId": payload.chat_id})
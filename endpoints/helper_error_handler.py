@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+import requests
+from fastapi import HTTPException, Request
+
+from core.language_support import normalize_language
+from endpoints.helper_fail_response import build_success_error_response
+from endpoints.files_pdf.utils import extract_user_id
+
+_TIMEOUT_ERRORS = (TimeoutError, asyncio.TimeoutError, httpx.TimeoutException, requests.Timeout)
+
+Endpoint = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+def file_error_handler(*, tool: str, logger: logging.Logger) -> Callable[[Endpoint], Endpoint]:
+    """
+    Turn any failure of a `(payload, request)` file endpoint into the success-shaped error
+    payload. Client-side 4xx and timeouts are logged as one-line warnings without a
+    traceback; only unexpected failures pay for exc_info.
+    """
+
+    def decorator(func: Endpoint) -> Endpoint:
+        @functools.wraps(func)
+        async def wrapper(payload: Any, request: Request) -> Dict[str, Any]:
+            try:
+                return await func(payload, request)
+            except HTTPException as exc:
+                status_code, detail = exc.status_code, exc.detail
+                if status_code < 500:
+                    logger.warning(
+                        "%s rejected | chatId=%s status=%s",
+                        tool,
+                        payload.chat_id,
+                        status_code,
+                        extra={"exc_type": type(exc).__name__},
+                    )
+                else:
+                    logger.error("%s HTTPException", tool, exc_info=exc, extra={"chatId": payload.chat_id})
+            except _TIMEOUT_ERRORS as exc:
+                status_code, detail = 408, str(exc) or "timeout"
+                logger.warning(
+                    "%s timed out | chatId=%s",
+                    tool,
+                    payload.chat_id,
+                    extra={"exc_type": type(exc).__name__},
+                )
+            except RuntimeError as exc:
+                status_code, detail = 500, str(exc)
+                logger.error("%s failed | chatId=%s error=%s", tool, payload.chat_id, exc)
+            except Exception as exc:
+                status_code, detail = 500, str(exc)
+                logger.error("%s failed", tool, exc_info=exc, extra={"chatId": payload.chat_id})
+            return build_success_error_response(
+                tool=tool,
+                language=normalize_language(payload.language) or "English",
+                chat_id=payload.chat_id,
+                user_id=extract_user_id(request),
+                status_code=status_code,
+                detail=detail,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+__all__ = ["file_error_handler"]
@@ -1,9 +1,21 @@
+import asyncio
 import os
 from typing import Any, Dict, Optional
 
 from errors_response.api_errors import get_api_error_message
 from core.useChatPersistence import chat_persistence
 
+# Keeps background error saves alive until they finish; the loop holds only weak references.
+_PENDING_SAVES: "set[asyncio.Future[Any]]" = set()
+
+
+def _save_error_message(**kwargs: Any) -> None:
+    try:
+        chat_persistence.save_assistant_message(**kwargs)
+    except Exception:
+        # Fail silently; logging is handled at call sites if needed
+        pass
+
 
 def build_success_error_response(
     *,
@@ -16,7 +28,8 @@ def build_success_error_response(
 ) -> Dict[str, Any]:
     """
     Returns a success-shaped payload carrying a friendly error message,
-    and persists it to Firestore if chat_id is present.
+    and persists it to Firestore if chat_id is present (in the background when
+    called from a running event loop).
     """
     def _map_error_key(code: int) -> str:
         if code == 404:
@@ -36,23 +49,30 @@ def build_success_error_response(
     message_id = f"{tool}_error_{os.urandom(4).hex()}"
 
     if chat_id and user_id:
+        save_kwargs = dict(
+            user_id=user_id,
+            chat_id=chat_id,
+            content=msg,
+            metadata={
+                "tool": tool,
+                "error": key,
+                "detail": str(detail)[:1000],
+                "status": status_code,
+            },
+            message_id=message_id,
+            client_message_id=message_id,
+        )
         try:
-            chat_persistence.save_assistant_message(
-                user_id=user_id,
-                chat_id=chat_id,
-                content=msg,
-                metadata={
-                    "tool": tool,
-                    "error": key,
-                    "detail": str(detail)[:1000],
-                    "status": status_code,
-                },
-                message_id=message_id,
-                client_message_id=message_id,
-            )
-        except Exception:
-            # Fail silently; logging is handled at call sites if needed
-            pass
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            _save_error_message(**save_kwargs)
+        else:
+            # Called from an endpoint: persist off the event loop and return the payload right away.
+            future = loop.create_task(asyncio.to_thread(_save_error_message, **save_kwargs))
+            _PENDING_SAVES.add(future)
+            future.add_done_callback(_PENDING_SAVES.discard)
 
     return {
         "success": True,
@@ -20,29 +20,30 @@ def json_pretty(obj: Any) -> str:
 def log_request(logger: logging.Logger, name: str, payload_obj: Any) -> None:
     """
     Log an incoming request payload as pretty JSON.
-    Tries pydantic model_dump when available.
+    Pydantic models are serialized by model_dump_json, without an intermediate dict.
     Includes endpoint label if method/path keys exist.
+    Skipped entirely when INFO is disabled, so the dump and JSON encoding are never paid for.
     """
-    try:
-        if isinstance(payload_obj, dict):
-            payload_dict = payload_obj
-        else:
-            payload_dict = getattr(payload_obj, "model_dump", None)
-            if callable(payload_dict):
-                payload_dict = payload_dict(by_alias=True, exclude_none=True)
-            else:
-                payload_dict = payload_obj
-    except Exception:
-        payload_dict = payload_obj
-
-    method = None
-    path = None
-    if isinstance(payload_dict, dict):
-        method = payload_dict.get("method")
-        path = payload_dict.get("path")
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    body = None
+    if isinstance(payload_obj, dict):
+        method = payload_obj.get("method")
+        path = payload_obj.get("path")
+    else:
+        method = getattr(payload_obj, "method", None)
+        path = getattr(payload_obj, "path", None)
+        dump_json = getattr(payload_obj, "model_dump_json", None)
+        if callable(dump_json):
+            try:
+                body = dump_json(by_alias=True, exclude_none=True, indent=2)
+            except Exception:
+                body = None
+    if body is None:
+        body = json_pretty(payload_obj)
     endpoint_label = f"{method} {path}" if method and path else name
 
-    logger.info("%s request JSON (%s):\n%s", name, endpoint_label, json_pretty(payload_dict))
+    logger.info("%s request JSON (%s):\n%s", name, endpoint_label, body)
 
 
 def log_response(logger: logging.Logger, name: str, response_obj: Any) -> None:
@@ -50,6 +51,8 @@ def log_response(logger: logging.Logger, name: str, response_obj: Any) -> None:
     Log an outgoing response payload as pretty JSON.
     If response_obj is a dict containing an 'endpoint', use it in the label.
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
     endpoint_label = None
     if isinstance(response_obj, dict):
         endpoint_label = response_obj.get("endpoint")
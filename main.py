@@ -39,6 +39,9 @@ from jose import jwt, JWTError
 import firebase_admin
 from firebase_admin import credentials, storage, firestore
 import os, sys, logging
+import atexit
+import logging.handlers
+import queue
 import socketio as socketio_lib
 
 # Import error handler
@@ -120,6 +123,13 @@ from endpoints.files_pdf import (
 )
 # from endpoints.image_edit import router as image_edit_router
 from core.websocket_manager import sio
+from core.convert_pool import get_pool, shutdown_pool, start_listeners
+from endpoints.files_pdf.utils import (
+    GEMINI_API_ORIGIN,
+    close_async_http_client,
+    get_async_http_client,
+    warm_async_http_client,
+)
 
 
 router = APIRouter()
@@ -130,11 +140,18 @@ router = APIRouter()
 LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
 LOG_FORMAT = os.getenv("LOG_FORMAT", "%(asctime)s %(levelname)s [%(name)s] %(message)s")
 
+# Records are formatted by the caller but written to stdout by one listener thread,
+# so a slow or contended stdout never stalls the event loop.
+_LOG_QUEUE: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_LOG_LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, logging.StreamHandler(sys.stdout))
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
+
 # Root logger -> stdout, force override uvicorn defaults
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL, logging.DEBUG),
     format=LOG_FORMAT,
-    handlers=[logging.StreamHandler(sys.stdout)],
+    handlers=[logging.handlers.QueueHandler(_LOG_QUEUE)],
     force=True,  # override any existing handlers from uvicorn etc.
 )
 
@@ -197,6 +214,34 @@ app = FastAPI(title="Avenia PDF Read API", version="1.0.0")
 # Setup error handlers
 setup_error_handlers(app)
 
+
+@app.on_event("startup")
+async def _start_office_listeners() -> None:
+    # Warm LibreOffice in the background so early conversions skip the soffice start-up.
+    app.state.office_pool = get_pool()
+    app.state.office_listeners_task = asyncio.create_task(start_listeners())
+
+
+@app.on_event("shutdown")
+async def _stop_office_pool() -> None:
+    # Workers stop their LibreOffice listeners as they exit, so no soffice outlives the app.
+    await asyncio.to_thread(shutdown_pool)
+
+
+@app.on_event("startup")
+async def _open_http_client() -> None:
+    # One pooled HTTP/2 client for file downloads and Gemini uploads, shared by every endpoint.
+    app.state.http = get_async_http_client()
+    # Handshake with Gemini in the background so the first upload reuses a warm connection.
+    app.state.http_warmup_task = asyncio.create_task(
+        warm_async_http_client([GEMINI_API_ORIGIN])
+    )
+
+
+@app.on_event("shutdown")
+async def _close_http_client() -> None:
+    await close_async_http_client()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -278,7 +323,7 @@ JWT_SECRET = os.getenv("JWT_HS_SECRET", "change_me_in_production")
 JWT_ISSUER = os.getenv("JWT_ISS", "chatgbtmini")
 JWT_AUDIENCE = os.getenv("JWT_AUD", "chatgbtmini-mobile")
 
-PUBLIC_PATHS = {"/healthz", "/health", "/docs", "/openapi.json", "/redoc"}
+PUBLIC_PATHS = frozenset({"/healthz", "/health", "/docs", "/openapi.json", "/redoc"})
 
 auth_logger = logging.getLogger("pdfread.auth")
 